@@ -0,0 +1,104 @@
+"""
+Compares decoding the EAST network output with the old per-cell loop against the vectorized `decode_geometry`.
+
+Run with `python -m benchmarks.east_decode` from the project root. The network output is synthesized, so the model
+isn't needed: scores are noise with a share of the cells above the threshold, as if they were covered by text.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from pic_crypt.image.text import decode_geometry
+
+from .timing import timed
+
+# Pre-processed sizes, i.e. `--width`/`--height` of `replace-text`.
+SIZES = (320, 640, 1280, 1920)
+# Share of the cells scoring above the threshold.
+TEXT_SHARE = 0.05
+SCORE_THRESHOLD = 0.5
+NMS_THRESHOLD = 0.3
+
+
+def legacy_decode(scores: np.ndarray, geometry: np.ndarray, score_threshold: float):
+    """Decodes the network output one cell at a time in Python, as `east_text_bbox` did before `decode_geometry`."""
+    rows, cols = scores.shape[2:4]
+    detections, confidences = [], []
+
+    for y in range(rows):
+        score = scores[0, 0, y]
+        *dimensions, angles = tuple(geometry[0, i, y] for i in range(5))
+
+        for x in range(cols):
+            if score[x] < score_threshold:
+                continue
+
+            angle = angles[x]
+            cos = np.cos(angle)
+            sin = np.sin(angle)
+
+            height = dimensions[0][x] + dimensions[2][x]
+            width = dimensions[1][x] + dimensions[3][x]
+
+            offset_x, offset_y = (
+                x * 4.0 + cos * dimensions[1][x] + sin * dimensions[2][x],
+                y * 4.0 - sin * dimensions[1][x] + cos * dimensions[2][x],
+            )
+
+            p1 = (-sin * height + offset_x, -cos * height + offset_y)
+            p2 = (-cos * width + offset_x, sin * width + offset_y)
+            center = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+
+            detections.append((center, (width, height), -1 * angle * 180.0 / math.pi))
+            confidences.append(score[x])
+
+    return detections, confidences
+
+
+def network_output(size: int, rng: np.random.Generator):
+    """Returns scores and geometry shaped like the output of the network for a `size` square input."""
+    cells = size // 4
+    scores = rng.random((1, 1, cells, cells), dtype=np.float32) * SCORE_THRESHOLD
+    text = rng.random((cells, cells)) < TEXT_SHARE
+    scores[0, 0][text] += SCORE_THRESHOLD
+
+    geometry = rng.random((1, 5, cells, cells), dtype=np.float32) * 40
+    geometry[0, 4] = (rng.random((cells, cells), dtype=np.float32) - 0.5) * 0.5
+    return scores, geometry
+
+
+def flatten(detections) -> np.ndarray:
+    return np.array([(*center, *size, angle) for center, size, angle in detections])
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    print(f"{'size':>6} {'cells':>8} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        scores, geometry = network_output(size, rng)
+
+        legacy_time, (legacy, legacy_scores) = timed(
+            legacy_decode, scores, geometry, SCORE_THRESHOLD
+        )
+        numpy_time, (detections, confidences) = timed(
+            decode_geometry, scores, geometry, SCORE_THRESHOLD
+        )
+
+        assert np.allclose(flatten(legacy), flatten(detections), rtol=1e-4, atol=1e-3)
+        assert np.allclose(legacy_scores, confidences)
+        kept = cv2.dnn.NMSBoxesRotated(
+            detections, confidences, SCORE_THRESHOLD, NMS_THRESHOLD
+        )
+        assert len(kept) > 0
+
+        print(
+            f"{size:>6} {len(detections):>8} {legacy_time * 1000:>10.1f}"
+            f" {numpy_time * 1000:>10.1f} {legacy_time / numpy_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Reports the peak bytes each encoding stage allocates, as measured by `tracemalloc`, see `pic_crypt.memory`.
+
+Run with `python -m benchmarks.encode_memory` from the project root, exits with an error when any stage of a
+copy-free encode allocates as much as the image, so it can guard against regressions in CI.
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+
+from pic_crypt import memory
+from pic_crypt.encoders import DirectEncoder, LsbSteganographyEncoder
+
+COVER_SHAPE = (2048, 2048, 3)
+PAYLOAD_SIZE = 1 << 20
+
+
+def report(name: str, stages: dict[str, int], image_size: int) -> bool:
+    """Prints the stages, returns whether any of them allocated as much as the image."""
+    peak = max(stages.values(), default=0)
+    details = ", ".join(
+        f"{stage}={nbytes:,}" for stage, nbytes in sorted(stages.items())
+    )
+    print(f"{name:>22} {peak:>14,}  {details}")
+    return peak >= image_size
+
+
+def main():
+    rng = np.random.default_rng(0)
+    cover = rng.integers(0, 256, COVER_SHAPE, dtype=np.uint8)
+    data = os.urandom(PAYLOAD_SIZE)
+
+    print(f"cover: {COVER_SHAPE}, payload: {PAYLOAD_SIZE:,} bytes")
+    print(f"{'encode':>22} {'peak bytes':>14}  stages")
+
+    copied = []
+    for bits_per_channel in (1, 2, 4):
+        encoder = LsbSteganographyEncoder(
+            data, cover, bits_per_channel=bits_per_channel
+        )
+        with memory.track() as stages:
+            encoder.encode()
+        report(f"lsb {bits_per_channel}-bit copy", stages, cover.nbytes)
+
+        out = cover.copy()
+        with memory.track() as stages:
+            encoder.encode(out=out)
+        if report(f"lsb {bits_per_channel}-bit in-place", stages, cover.nbytes):
+            copied.append(f"lsb {bits_per_channel}-bit")
+
+    encoder = DirectEncoder(data, framed=True)
+    image_size = math.prod(encoder.shape())
+    with memory.track() as stages:
+        encoder.encode()
+    report("direct framed", stages, image_size)
+
+    out = np.empty(encoder.shape(), dtype=np.uint8)
+    with memory.track() as stages:
+        encoder.encode(out=out)
+    if report("direct framed out", stages, image_size):
+        copied.append("direct")
+
+    if copied:
+        sys.exit(f"Copy-free encodes allocated an image: {', '.join(copied)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares the write throughput of `Image.save` settings across image sizes and contents.
+
+Run with `python -m benchmarks.image_save` from the project root.
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from pic_crypt.image import Image
+
+SIDES = (512, 2048, 4096)
+SETTINGS = {
+    "default": (".png", {}),
+    "fast": (".png", {"fast": True}),
+    "level 6": (".png", {"level": 6}),
+    "parallel": (".png", {"workers": os.cpu_count() or 1}),
+    "parallel 6": (".png", {"workers": os.cpu_count() or 1, "level": 6}),
+    "tiff": (".tiff", {}),
+    "tiff fast": (".tiff", {"fast": True}),
+}
+
+
+def images(side: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    text = Path("docs/presentation.md").read_bytes()
+    size = side * side * 3
+    return {
+        # What `DirectEncoder` produces for encrypted data.
+        "random": rng.integers(0, 256, (side, side, 3), dtype=np.uint8),
+        # What `DirectEncoder` produces for plain text.
+        "text": np.frombuffer((text * (size // len(text) + 1))[:size], np.uint8)
+        .reshape(side, side, 3)
+        .copy(),
+    }
+
+
+def main():
+    print(f"workers: {os.cpu_count()}")
+    print(f"{'image':>14} {'setting':>11} {'MB/s':>8} {'size MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in SIDES:
+            for kind, img in images(side).items():
+                for name, (suffix, options) in SETTINGS.items():
+                    path = Path(tmp) / f"image{suffix}"
+                    start = time.perf_counter()
+                    Image(img).save(path, **options)
+                    elapsed = time.perf_counter() - start
+
+                    print(
+                        f"{f'{kind} {side}px':>14} {name:>11}"
+                        f" {img.nbytes / elapsed / 1e6:>8.1f}"
+                        f" {path.stat().st_size / 1e6:>8.2f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
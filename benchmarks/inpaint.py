@@ -0,0 +1,70 @@
+"""
+Compares inpainting text boxes one full-image pass at a time against the strategies of `inpaint_bbox`.
+
+Run with `python -m benchmarks.inpaint` from the project root.
+"""
+
+import cv2
+import numpy as np
+
+from pic_crypt.image.text import InpaintStrategy, inpaint_bbox
+
+from .timing import timed
+
+IMAGE_SHAPES = ((1080, 1920, 3), (2160, 3840, 3))
+BOX_COUNTS = (1, 12, 48)
+# Width and height of a box of text.
+BOX_SIZE = (120, 24)
+
+
+def legacy_inpaint(img: np.ndarray, bboxes: np.ndarray) -> np.ndarray:
+    """Masks and inpaints the whole image once per box, as `inpaint_bbox` did before it had strategies."""
+    for pts in bboxes:
+        mask = np.zeros(img.shape[:2], np.uint8)
+        cv2.fillPoly(mask, [pts], 255)
+        img = cv2.inpaint(img, mask, 3, cv2.INPAINT_NS)
+    return img
+
+
+def boxes(count: int, shape: tuple[int, ...], rng: np.random.Generator) -> np.ndarray:
+    """Returns `count` boxes of `BOX_SIZE` scattered over an image, as `east_text_bbox` would."""
+    width, height = BOX_SIZE
+    xs = rng.integers(0, shape[1] - width, count)
+    ys = rng.integers(0, shape[0] - height, count)
+    return np.array(
+        [
+            [[x, y + height], [x, y], [x + width, y], [x + width, y + height]]
+            for x, y in zip(xs, ys)
+        ],
+        dtype=np.int32,
+    )
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    print(f"box: {BOX_SIZE}")
+    print(
+        f"{'image':>12} {'boxes':>6} {'strategy':>10} {'ms':>10} {'speedup':>8} {'max diff':>9}"
+    )
+    for shape in IMAGE_SHAPES:
+        # A smooth background, so inpainting has something to continue.
+        img = cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (0, 0), 15)
+        name = f"{shape[1]}x{shape[0]}"
+
+        for count in BOX_COUNTS:
+            bboxes = boxes(count, shape, rng)
+            legacy_time, expected = timed(legacy_inpaint, img, bboxes)
+            print(f"{name:>12} {count:>6} {'legacy':>10} {legacy_time * 1000:>10.1f}")
+
+            for strategy in InpaintStrategy:
+                elapsed, result = timed(inpaint_bbox, img, bboxes, strategy=strategy)
+                diff = np.abs(result.astype(np.int16) - expected).max()
+                print(
+                    f"{name:>12} {count:>6} {strategy.value:>10} {elapsed * 1000:>10.1f}"
+                    f" {legacy_time / elapsed:>7.1f}x {diff:>9}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""Helpers shared by the benchmarks."""
+
+import time
+from typing import Any, Callable
+
+
+def timed(func: Callable[..., Any], *args, **kwargs) -> tuple[float, Any]:
+    """Calls `func`, returns the seconds it took along with its result."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
@@ -0,0 +1,129 @@
+"""
+Decodes, and decrypts, many independent images at once across a process pool.
+
+Each image is read, decoded and decrypted within a worker, and results are yielded as the images finish.
+A failing image only fails its own result, the rest of the batch carries on.
+
+```py
+for path, data, error in decode_images(glob_images("out/*.png"), "steganography", b"passw0rd"):
+    ...
+```
+"""
+
+import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .ciphers import KDF, Cipher, KeyCache, identify
+from .detect import describe
+from .encoders import DirectEncoder, LsbSteganographyEncoder
+from .image import EncoderInterface, Image
+
+METHODS: dict[str, type[EncoderInterface]] = {
+    "direct": DirectEncoder,
+    "steganography": LsbSteganographyEncoder,
+}
+
+BatchResult = tuple[Path, bytes | None, str | None]
+
+_WorkerState = tuple[str, Cipher | None, bytes | None, KDF, KeyCache]
+# Set in each worker by `_init_worker`, so the secret is sent once per worker instead of with every image.
+_worker: _WorkerState | None = None
+
+
+def glob_images(pattern: str) -> list[Path]:
+    """Returns the files matching a glob pattern, `**` matches any number of directories."""
+    return sorted(
+        Path(path)
+        for path in glob.glob(pattern, recursive=True)
+        if Path(path).is_file()
+    )
+
+
+def read_manifest(path: Path) -> list[Path]:
+    """Returns the images listed in a manifest, one per line, relative to the manifest unless absolute."""
+    lines = (line.strip() for line in path.read_text().splitlines())
+    return [path.parent / line for line in lines if line and not line.startswith("#")]
+
+
+def _init_worker(
+    method: str, cipher: Cipher | None, secret: bytes | None, kdf: KDF
+) -> None:
+    global _worker
+    # A cache per worker, so images encrypted with the same salt derive their key once.
+    _worker = (method, cipher, secret, kdf, KeyCache())
+
+
+def _decode_auto(img: np.ndarray, secret: bytes | None, key_cache: KeyCache) -> bytes:
+    method = describe(img)[0]
+    if method not in METHODS:
+        raise Exception(
+            f"{method=}, The data is split across images, decode their directory instead."
+        )
+
+    data = METHODS[method]().decode(img)
+    # Told from the decoded data, so nothing depends on how much of it the headers let `describe` peek at.
+    recorded = identify(data)
+    if recorded is None:
+        return data
+    cipher = recorded[0]
+    if secret is None:
+        raise Exception("The data is encrypted, but no key was given.")
+    return cipher.value(key_cache=key_cache).decrypt(data, secret=secret)
+
+
+def _decode_item(path: Path) -> BatchResult:
+    assert _worker is not None
+    method, cipher, secret, kdf, key_cache = _worker
+    try:
+        img = Image.read(path).as_array()
+        if method == "auto":
+            data = _decode_auto(img, secret, key_cache)
+        else:
+            data = METHODS[method]().decode(img)
+            if cipher is not None:
+                assert secret is not None
+                data = cipher.value(key_cache=key_cache).decrypt(
+                    data, secret=secret, kdf=kdf.value()
+                )
+    except Exception as e:
+        return path, None, repr(e)
+    return path, data, None
+
+
+def decode_images(
+    paths: Iterable[Path],
+    method: str = "direct",
+    secret: bytes | None = None,
+    cipher: Cipher = Cipher.ChaCha20,
+    kdf: KDF = KDF.Argon2,
+    max_workers: int | None = None,
+) -> Iterator[BatchResult]:
+    """
+    Decodes each image with `method`, and decrypts it when `secret` is given.
+
+    - `method` is a key of `METHODS`, or `auto` to tell each image's method and cipher from its headers, see
+    `pic_crypt.detect`. Then only the images recorded as encrypted are decrypted.
+    - Yields `(path, data, error)` in the order the images finish, with either `data` or `error` set.
+    - `kdf` is only used for data in the legacy format, envelopes record their own.
+    - `max_workers` defaults to the CPU count.
+    """
+    if method != "auto" and method not in METHODS:
+        raise ValueError(f"{method=}, Unknown decoding method.")
+
+    with ProcessPoolExecutor(
+        max_workers,
+        initializer=_init_worker,
+        initargs=(method, None if secret is None else cipher, secret, kdf),
+    ) as executor:
+        futures = {executor.submit(_decode_item, path): path for path in paths}
+        for future in as_completed(futures):
+            path = futures.pop(future)
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself failed, e.g. it was killed.
+                yield path, None, repr(e)
@@ -0,0 +1,129 @@
+"""
+Tunes the cost of the KDFs to the machine, so deriving a key takes about as long as is acceptable.
+
+The tuned parameters can be saved to a config file, which encryption then uses in place of the defaults.
+Decryption doesn't need it, the parameters are recorded alongside the encrypted data.
+
+```py
+kdf = calibrate_argon2(target=0.5, max_memory=64 * 1024)
+save_config({KDF.Argon2: kdf})
+```
+"""
+
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import argon2
+
+from .ciphers import KDF, PBKDF2, Argon2, KDFInterface
+
+CONFIG_ENV = "PIC_CRYPT_CONFIG"
+# Argon2 needs at least 8 KiB of memory per lane.
+MIN_MEMORY_PER_LANE = 8
+# Iterations PBKDF2 is measured with, enough for a stable timing without taking long.
+PBKDF2_PROBE_ITERATIONS = 100_000
+
+
+def config_path() -> Path:
+    """
+    Returns where the tuned KDF parameters are saved.
+
+    - `$PIC_CRYPT_CONFIG` if set
+    - otherwise `pic-crypt/kdf.json` in `$XDG_CONFIG_HOME`, defaulting to `~/.config`
+    """
+    if path := os.environ.get(CONFIG_ENV):
+        return Path(path)
+    config_home = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    return Path(config_home) / "pic-crypt" / "kdf.json"
+
+
+def measure(kdf: KDFInterface, rounds: int = 3) -> float:
+    """Returns the median number of seconds `kdf` takes to derive a key."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        kdf.hash(b"pic-crypt calibration")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate_pbkdf2(target: float, rounds: int = 3) -> PBKDF2:
+    """Returns a `PBKDF2` with as many iterations as take about `target` seconds."""
+    elapsed = measure(PBKDF2(iterations=PBKDF2_PROBE_ITERATIONS), rounds)
+    iterations = int(PBKDF2_PROBE_ITERATIONS * target / elapsed)
+    return PBKDF2(iterations=min(max(iterations, 1), PBKDF2.MAX_ITERATIONS))
+
+
+def calibrate_argon2(
+    target: float,
+    max_memory: int,
+    parallelism: int | None = None,
+    rounds: int = 3,
+) -> Argon2:
+    """
+    Returns an `Argon2` which takes about `target` seconds, using at most `max_memory` KiB.
+
+    - Memory is preferred over passes, it's what makes Argon2 expensive to attack,
+    so all of `max_memory` is used and the remaining time is spent on passes.
+    - If a single pass over `max_memory` is already too slow, memory is halved until it fits.
+    - `parallelism` defaults to the number of CPUs, at most the argon2-cffi default.
+    """
+    if parallelism is None:
+        parallelism = min(os.cpu_count() or 1, argon2.DEFAULT_PARALLELISM)
+    memory_cost = min(max_memory, Argon2.MAX_MEMORY_COST)
+    min_memory = MIN_MEMORY_PER_LANE * parallelism
+    if memory_cost < min_memory:
+        raise ValueError(
+            f"{max_memory=}, Argon2 needs at least {min_memory} KiB for {parallelism=}."
+        )
+
+    while True:
+        elapsed = measure(
+            Argon2(time_cost=1, memory_cost=memory_cost, parallelism=parallelism),
+            rounds,
+        )
+        if elapsed <= target or memory_cost // 2 < min_memory:
+            break
+        memory_cost //= 2
+
+    time_cost = min(max(int(target / elapsed), 1), Argon2.MAX_TIME_COST)
+    return Argon2(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def _kdf_config(kdf: KDFInterface) -> dict[str, int]:
+    if isinstance(kdf, PBKDF2):
+        return {"iterations": kdf.iterations}
+    if isinstance(kdf, Argon2):
+        return {
+            "time_cost": kdf.time_cost,
+            "memory_cost": kdf.memory_cost,
+            "parallelism": kdf.parallelism,
+        }
+    raise Exception(f"{type(kdf)=}, Unsupported KDF.")
+
+
+def load_config(path: Path | None = None) -> dict[str, dict[str, int]]:
+    """Returns the saved parameters of each KDF by name, or nothing if none were saved."""
+    path = config_path() if path is None else path
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_config(kdfs: dict[KDF, KDFInterface], path: Path | None = None) -> Path:
+    """Saves the parameters of `kdfs`, keeping those saved for any other KDF. Returns the path saved to."""
+    path = config_path() if path is None else path
+    config = load_config(path)
+    config.update({kdf.name: _kdf_config(instance) for kdf, instance in kdfs.items()})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(config, indent=4) + "\n")
+    return path
+
+
+def configured_kdf(kdf: KDF, path: Path | None = None) -> KDFInterface:
+    """Returns a new instance of `kdf` for encrypting, with the saved parameters if there are any."""
+    return kdf.value(**load_config(path).get(kdf.name, {}))
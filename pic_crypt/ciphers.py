@@ -1,21 +1,64 @@
 import base64
 import hashlib
+import hmac
 import os
+import struct
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
-from typing import Protocol
+from typing import Iterable, Iterator, Protocol
 
 import argon2
 import cryptography.hazmat.primitives.ciphers.aead as cryptography_ciphers
+from cryptography.exceptions import InvalidTag
+
+# Neither magic is valid base64, so envelopes can't be mistaken for the older format.
+ENVELOPE_MAGIC = b"\x89PCE"
+STREAM_MAGIC = b"\x89PCS"
+ENVELOPE_VERSION = 1
+# magic, version, cipher id, kdf id, salt length
+ENVELOPE_HEADER = struct.Struct(">4sBBBB")
+NONCE_SIZE = 12
+# Follows the nonce, so data padded after the envelope, e.g. by `DirectEncoder`, isn't taken as ciphertext.
+CIPHERTEXT_LENGTH = struct.Struct(">Q")
+TAG_SIZE = 16
+
+# Streams follow the KDF salt with the segment size and the nonce prefix, each segment's nonce is the prefix,
+# a big-endian u32 counter and a byte flagging the last segment.
+SEGMENT_SIZE = 64 * 1024
+STREAM_SEGMENT = struct.Struct(">I")
+NONCE_PREFIX_SIZE = 7
 
 
 class KDFInterface(Protocol):
     salt: bytes
 
+    # Identifies the KDF in cipher envelopes, `PARAMS` holds its parameters there.
+    KDF_ID: int
+    PARAMS: struct.Struct
+
     def hash(self, secret: bytes) -> bytes:
         ...
 
+    def pack_params(self) -> bytes:
+        ...
+
+    @classmethod
+    def unpack_params(cls, salt: bytes, params: bytes) -> "KDFInterface":
+        ...
+
+    def params(self) -> tuple:
+        """Returns everything besides the salt and secret which the derived key depends on."""
+        ...
+
 
 class PBKDF2(KDFInterface):
+    KDF_ID = 1
+    PARAMS = struct.Struct(">I")  # iterations
+    # Bounds recorded parameters, so corrupted data can't stall a decrypt.
+    MAX_ITERATIONS = 50_000_000
+
     def __init__(self, salt: bytes | None = None, iterations: int = 500_000):
         self.salt = os.urandom(16) if salt is None else salt
         self.iterations = iterations
@@ -23,8 +66,28 @@ class PBKDF2(KDFInterface):
     def hash(self, secret: bytes) -> bytes:
         return hashlib.pbkdf2_hmac("sha256", secret, self.salt, self.iterations)
 
+    def params(self) -> tuple:
+        return ("PBKDF2", self.iterations)
+
+    def pack_params(self) -> bytes:
+        return self.PARAMS.pack(self.iterations)
+
+    @classmethod
+    def unpack_params(cls, salt: bytes, params: bytes) -> "PBKDF2":
+        (iterations,) = cls.PARAMS.unpack(params)
+        if not 0 < iterations <= cls.MAX_ITERATIONS:
+            raise Exception(f"{iterations=}, Unreasonable KDF parameters.")
+        return cls(salt, iterations)
+
 
 class Argon2(KDFInterface):
+    KDF_ID = 2
+    # time cost, memory cost, parallelism, hash length, type
+    PARAMS = struct.Struct(">IIHBB")
+    # Bounds recorded parameters, so corrupted data can't stall a decrypt or exhaust memory.
+    MAX_TIME_COST = 100
+    MAX_MEMORY_COST = 4 * 1024 * 1024  # KiB
+
     def __init__(
         self,
         salt: bytes | None = None,
@@ -52,6 +115,114 @@ class Argon2(KDFInterface):
             type=self.kind,
         )
 
+    def params(self) -> tuple:
+        return (
+            "Argon2",
+            self.time_cost,
+            self.memory_cost,
+            self.parallelism,
+            self.hash_len,
+            self.kind.value,
+        )
+
+    def pack_params(self) -> bytes:
+        return self.PARAMS.pack(
+            self.time_cost,
+            self.memory_cost,
+            self.parallelism,
+            self.hash_len,
+            self.kind.value,
+        )
+
+    @classmethod
+    def unpack_params(cls, salt: bytes, params: bytes) -> "Argon2":
+        time_cost, memory_cost, parallelism, hash_len, kind = cls.PARAMS.unpack(params)
+        if time_cost > cls.MAX_TIME_COST or memory_cost > cls.MAX_MEMORY_COST:
+            raise Exception(
+                f"{time_cost=}, {memory_cost=}, Unreasonable KDF parameters."
+            )
+        return cls(
+            salt, time_cost, memory_cost, parallelism, hash_len, argon2.Type(kind)
+        )
+
+
+class KeyCache:
+    """
+    An in-process LRU cache of derived keys, to skip re-running the KDF for the same secret, salt and parameters.
+
+    - Holds at most `max_size` keys, each for at most `ttl` seconds.
+    - Secrets are never stored, entries are looked up by an HMAC of the secret under a random per-cache key.
+    - Evicted keys are overwritten with zeros, though copies handed out to ciphers can't be.
+
+    ```py
+    cache = KeyCache()
+    cipher = PBChaCha20(key_cache=cache)
+    for data in encrypted:
+        cipher.decrypt(data, b"1234")  # only the first call runs the KDF
+    ```
+    """
+
+    def __init__(self, max_size: int = 64, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._pepper = os.urandom(32)
+        self._entries: OrderedDict[tuple, tuple[float, bytearray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, entry_id: tuple) -> None:
+        _, key = self._entries.pop(entry_id)
+        key[:] = bytes(len(key))
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            entry_id
+            for entry_id, (created, _) in self._entries.items()
+            if now - created > self.ttl
+        ]
+        for entry_id in expired:
+            self._evict(entry_id)
+
+    def derive(self, kdf: KDFInterface, secret: bytes) -> bytes:
+        """Returns the key `kdf` derives from `secret`, running the KDF only on a miss."""
+        entry_id = (
+            hmac.digest(self._pepper, secret, "sha256"),
+            bytes(kdf.salt),
+            kdf.params(),
+        )
+
+        with self._lock:
+            self._expire(time.monotonic())
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+                return bytes(self._entries[entry_id][1])
+
+        # The KDF runs outside the lock, so misses for different keys don't wait on each other.
+        derived = kdf.hash(secret)
+
+        with self._lock:
+            if entry_id in self._entries:
+                self._evict(entry_id)
+            self._entries[entry_id] = (time.monotonic(), bytearray(derived))
+            while len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+
+        return derived
+
+    def clear(self) -> None:
+        """Zeroes and drops every cached key."""
+        with self._lock:
+            for entry_id in list(self._entries):
+                self._evict(entry_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _derive_key(kdf: KDFInterface, secret: bytes, key_cache: KeyCache | None) -> bytes:
+    if key_cache is None:
+        return kdf.hash(secret)
+    return key_cache.derive(kdf, secret)
+
 
 class PBCipherInterface(Protocol):
     """Common interface for a password-based cipher."""
@@ -66,75 +237,308 @@ class PBCipherInterface(Protocol):
     ) -> bytes:
         ...
 
+    def encrypt_stream(
+        self,
+        chunks: Iterable[bytes],
+        secret: bytes,
+        kdf: KDFInterface = Argon2(),
+        segment_size: int = SEGMENT_SIZE,
+    ) -> Iterator[bytes]:
+        ...
 
-class PBAESGCM(PBCipherInterface):
-    """Password-based AESGCM."""
-
-    SEP = b"$"
-
-    def encrypt(
-        self, data: bytes, secret: bytes, kdf: KDFInterface = Argon2()
-    ) -> bytes:
-        salt = kdf.salt
-        key = kdf.hash(secret)
-        cipher = cryptography_ciphers.AESGCM(key)
-        nonce = os.urandom(12)
+    def decrypt_stream(
+        self, chunks: Iterable[bytes], secret: bytes, kdf: KDFInterface | None = None
+    ) -> Iterator[bytes]:
+        ...
 
-        encrypted_data = cipher.encrypt(nonce, data, None)
-        return (
-            base64.b64encode(salt)
-            + self.SEP
-            + base64.b64encode(nonce)
-            + self.SEP
-            + base64.b64encode(encrypted_data)
-        )
 
-    def decrypt(
-        self, data: bytes, secret: bytes, kdf: KDFInterface = Argon2()
-    ) -> bytes:
-        salt, nonce, data = map(base64.b64decode, data.split(self.SEP))
-        assert len(nonce) == 12, "Corrupted encrypted data."
+def is_envelope(data: bytes) -> bool:
+    """Returns whether the data is a binary envelope, as opposed to the older base64 format."""
+    return bytes(data[: len(ENVELOPE_MAGIC)]) in (ENVELOPE_MAGIC, STREAM_MAGIC)
 
-        kdf.salt = salt
-        key = kdf.hash(secret)
-        cipher = cryptography_ciphers.AESGCM(key)
 
-        return cipher.decrypt(nonce, data, None)
+def is_stream(data: bytes) -> bool:
+    """Returns whether the data was encrypted by `encrypt_stream`."""
+    return bytes(data[: len(STREAM_MAGIC)]) == STREAM_MAGIC
 
 
-class PBChaCha20(PBCipherInterface):
-    """Password-based Chacha20."""
+def _envelope_prefix(magic: bytes, cipher_id: int, kdf: KDFInterface) -> bytes:
+    return (
+        ENVELOPE_HEADER.pack(
+            magic, ENVELOPE_VERSION, cipher_id, kdf.KDF_ID, len(kdf.salt)
+        )
+        + kdf.pack_params()
+        + kdf.salt
+    )
+
+
+def _kdf_class(kdf_id: int) -> type:
+    kdf_cls = next((kdf.value for kdf in KDF if kdf.value.KDF_ID == kdf_id), None)
+    if kdf_cls is None:
+        raise Exception(f"{kdf_id=}, Unknown KDF.")
+    return kdf_cls
+
+
+def _prefix_size(header: bytes) -> int:
+    """Returns the size of the header, KDF parameters and salt at the start of an envelope."""
+    *_, kdf_id, salt_len = ENVELOPE_HEADER.unpack_from(header)
+    return ENVELOPE_HEADER.size + _kdf_class(kdf_id).PARAMS.size + salt_len
+
+
+def _open_prefix(view: memoryview, magic: bytes) -> tuple[int, KDFInterface, int]:
+    """Parses the start of an envelope, returns the cipher id, the KDF and where the prefix ends."""
+    try:
+        found, version, cipher_id, kdf_id, salt_len = ENVELOPE_HEADER.unpack_from(view)
+    except struct.error:
+        raise Exception("Corrupted encrypted data.")
+    if found != magic:
+        raise Exception("The data isn't an encrypted envelope.")
+    if version != ENVELOPE_VERSION:
+        raise Exception(f"{version=}, Unsupported envelope version.")
+
+    kdf_cls = _kdf_class(kdf_id)
+    salt_start = ENVELOPE_HEADER.size + kdf_cls.PARAMS.size
+    end = salt_start + salt_len
+    if len(view) < end:
+        raise Exception("Corrupted encrypted data.")
+
+    kdf = kdf_cls.unpack_params(
+        bytes(view[salt_start:end]), view[ENVELOPE_HEADER.size : salt_start]
+    )
+    return cipher_id, kdf, end
+
+
+def open_envelope(
+    data: bytes,
+) -> tuple[int, KDFInterface, memoryview, memoryview, memoryview]:
+    """
+    Parses a binary envelope, without copying the ciphertext.
+
+    Returns the cipher id, the KDF with its recorded salt and parameters, the header (authenticated as associated
+    data), the nonce and the ciphertext.
+    """
+    view = memoryview(data)
+    cipher_id, kdf, nonce_start = _open_prefix(view, ENVELOPE_MAGIC)
+    data_start = nonce_start + NONCE_SIZE + CIPHERTEXT_LENGTH.size
+    if len(view) < data_start:
+        raise Exception("Corrupted encrypted data.")
+    (data_len,) = CIPHERTEXT_LENGTH.unpack_from(view, nonce_start + NONCE_SIZE)
+    if len(view) < data_start + data_len:
+        raise Exception("Corrupted encrypted data.")
+
+    return (
+        cipher_id,
+        kdf,
+        view[:nonce_start],
+        view[nonce_start : nonce_start + NONCE_SIZE],
+        view[data_start : data_start + data_len],
+    )
+
+
+def _segment_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    return prefix + counter.to_bytes(4, "big") + bytes([last])
+
+
+def _decrypt_last_segment(
+    key: cryptography_ciphers.AESGCM | cryptography_ciphers.ChaCha20Poly1305,
+    nonce: bytes,
+    data: bytearray,
+    header: bytes,
+) -> bytes:
+    """
+    Decrypts the last segment of a stream, which may be followed by zero padding.
+
+    The segment ends where the padding begins, unless its tag ends with zeros too, so only the first few lengths
+    from there are tried.
+    """
+    end = max(len(data.rstrip(b"\0")), TAG_SIZE)
+    for size in range(end, min(end + TAG_SIZE, len(data))):
+        try:
+            return key.decrypt(nonce, data[:size], header)
+        except InvalidTag:
+            pass
+    return key.decrypt(nonce, data[: min(end + TAG_SIZE, len(data))], header)
+
+
+class _PBAEADCipher(PBCipherInterface):
+    """
+    A password-based cipher around an AEAD from `cryptography`.
+
+    Data is encrypted into a binary envelope:
+    - `ENVELOPE_HEADER`: magic, version, cipher id, kdf id and salt length.
+    - The KDF parameters, see `KDFInterface.PARAMS`, then the salt.
+    - The nonce, the length of the ciphertext, then the ciphertext with its tag.
+
+    The header, parameters and salt are authenticated as associated data.
+    Data in the older format, base64 salt, nonce and ciphertext joined with `SEP`, is still decrypted.
+    Keys are derived through `key_cache` when given, see `KeyCache`.
+
+    Large data can be encrypted a segment at a time by `encrypt_stream`, see `decrypt_stream`.
+    """
+
+    CIPHER_ID: int
+    AEAD: type
 
     SEP = b"$"
 
+    def __init__(self, key_cache: KeyCache | None = None):
+        self.key_cache = key_cache
+
     def encrypt(
         self, data: bytes, secret: bytes, kdf: KDFInterface = Argon2()
     ) -> bytes:
-        salt = kdf.salt
-        key = kdf.hash(secret)
-        cipher = cryptography_ciphers.ChaCha20Poly1305(key)
-        nonce = os.urandom(12)
+        key = _derive_key(kdf, secret, self.key_cache)
+        header = _envelope_prefix(ENVELOPE_MAGIC, self.CIPHER_ID, kdf)
+        nonce = os.urandom(NONCE_SIZE)
 
-        encrypted_data = cipher.encrypt(nonce, data, None)
+        encrypted_data = self.AEAD(key).encrypt(nonce, data, header)
         return (
-            base64.b64encode(salt)
-            + self.SEP
-            + base64.b64encode(nonce)
-            + self.SEP
-            + base64.b64encode(encrypted_data)
+            header
+            + nonce
+            + CIPHERTEXT_LENGTH.pack(len(encrypted_data))
+            + encrypted_data
         )
 
     def decrypt(
         self, data: bytes, secret: bytes, kdf: KDFInterface = Argon2()
     ) -> bytes:
-        salt, nonce, data = map(base64.b64decode, data.split(self.SEP))
-        assert len(nonce) == 12, "Corrupted encrypted data."
+        """Decrypts data, envelopes use their recorded KDF and parameters instead of `kdf`."""
+        if is_stream(data):
+            return b"".join(self.decrypt_stream([data], secret))
+        if not is_envelope(data):
+            return self._decrypt_legacy(data, secret, kdf)
+
+        cipher_id, kdf, header, nonce, encrypted_data = open_envelope(data)
+        if cipher_id != self.CIPHER_ID:
+            raise Exception(
+                f"{cipher_id=}, The data was encrypted with another cipher."
+            )
+
+        key = _derive_key(kdf, secret, self.key_cache)
+        return self.AEAD(key).decrypt(nonce, encrypted_data, header)
+
+    def encrypt_stream(
+        self,
+        chunks: Iterable[bytes],
+        secret: bytes,
+        kdf: KDFInterface = Argon2(),
+        segment_size: int = SEGMENT_SIZE,
+    ) -> Iterator[bytes]:
+        """
+        Encrypts data given in chunks of any size, yielding the header and then each encrypted segment.
+
+        - Follows the STREAM construction: every `segment_size` bytes are sealed with their own nonce, made of a
+          random prefix, the segment counter and a flag marking the last segment.
+          So segments can't be reordered, dropped or truncated without detection.
+        - Only one segment is held in memory at a time.
+        """
+        key = self.AEAD(_derive_key(kdf, secret, self.key_cache))
+        nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        header = (
+            _envelope_prefix(STREAM_MAGIC, self.CIPHER_ID, kdf)
+            + STREAM_SEGMENT.pack(segment_size)
+            + nonce_prefix
+        )
+        yield header
+
+        pending = bytearray()
+        counter = 0
+        for chunk in chunks:
+            pending += chunk
+            # A segment is only sealed once more data follows it, as the last one is flagged.
+            while len(pending) > segment_size:
+                nonce = _segment_nonce(nonce_prefix, counter, False)
+                yield key.encrypt(nonce, pending[:segment_size], header)
+                del pending[:segment_size]
+                counter += 1
+
+        yield key.encrypt(_segment_nonce(nonce_prefix, counter, True), pending, header)
+
+    def decrypt_stream(
+        self, chunks: Iterable[bytes], secret: bytes, kdf: KDFInterface | None = None
+    ) -> Iterator[bytes]:
+        """
+        Decrypts data from `encrypt_stream` given in chunks of any size, yielding each segment once it's verified.
+
+        - The recorded KDF and parameters are used, `kdf` is ignored.
+        - Zeros padding the data, e.g. by `DirectEncoder`, are ignored, as the last segment is found by its tag.
+        - Raises `cryptography.exceptions.InvalidTag` on tampered, reordered or truncated data.
+        """
+        chunks = iter(chunks)
+        pending = bytearray()
+
+        def fill(size: int) -> bool:
+            """Reads chunks until at least `size` bytes are pending, returns `False` if the data ends first."""
+            while len(pending) < size:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                pending.extend(chunk)
+            return True
+
+        if not fill(ENVELOPE_HEADER.size) or not is_stream(pending):
+            raise Exception("The data isn't an encrypted stream.")
+        header_size = (
+            _prefix_size(bytes(pending[: ENVELOPE_HEADER.size]))
+            + STREAM_SEGMENT.size
+            + NONCE_PREFIX_SIZE
+        )
+        if not fill(header_size):
+            raise Exception("Corrupted encrypted data.")
+        header = bytes(pending[:header_size])
+        del pending[:header_size]
+
+        cipher_id, stream_kdf, end = _open_prefix(memoryview(header), STREAM_MAGIC)
+        if cipher_id != self.CIPHER_ID:
+            raise Exception(
+                f"{cipher_id=}, The data was encrypted with another cipher."
+            )
+        (segment_size,) = STREAM_SEGMENT.unpack_from(header, end)
+        nonce_prefix = header[end + STREAM_SEGMENT.size :]
+        key = self.AEAD(_derive_key(stream_kdf, secret, self.key_cache))
+
+        sealed_size = segment_size + TAG_SIZE
+        counter = 0
+        # A segment is only known not to be the last once more data follows it, which may just be padding.
+        while fill(sealed_size + 1):
+            nonce = _segment_nonce(nonce_prefix, counter, False)
+            try:
+                segment = key.decrypt(nonce, pending[:sealed_size], header)
+            except InvalidTag:
+                break
+            yield segment
+            del pending[:sealed_size]
+            counter += 1
+
+        # The rest is the last segment, and any padding after it.
+        while fill(len(pending) + 1):
+            pass
+        yield _decrypt_last_segment(
+            key, _segment_nonce(nonce_prefix, counter, True), pending, header
+        )
+
+    def _decrypt_legacy(self, data: bytes, secret: bytes, kdf: KDFInterface) -> bytes:
+        salt, nonce, data = map(base64.b64decode, bytes(data).split(self.SEP))
+        assert len(nonce) == NONCE_SIZE, "Corrupted encrypted data."
 
         kdf.salt = salt
-        key = kdf.hash(secret)
-        cipher = cryptography_ciphers.ChaCha20Poly1305(key)
+        key = _derive_key(kdf, secret, self.key_cache)
+
+        return self.AEAD(key).decrypt(nonce, data, None)
+
 
-        return cipher.decrypt(nonce, data, None)
+class PBAESGCM(_PBAEADCipher):
+    """Password-based AESGCM."""
+
+    CIPHER_ID = 1
+    AEAD = cryptography_ciphers.AESGCM
+
+
+class PBChaCha20(_PBAEADCipher):
+    """Password-based Chacha20."""
+
+    CIPHER_ID = 2
+    AEAD = cryptography_ciphers.ChaCha20Poly1305
 
 
 class Cipher(Enum):
@@ -147,6 +551,22 @@ class KDF(Enum):
     Argon2 = Argon2
 
 
+def identify(data: bytes) -> tuple[Cipher, KDF] | None:
+    """
+    Returns the cipher and KDF recorded at the start of an envelope or stream, `None` for any other data.
+
+    Only the first `ENVELOPE_HEADER.size` bytes are needed.
+    """
+    if not is_envelope(data) or len(data) < ENVELOPE_HEADER.size:
+        return None
+    _, _, cipher_id, kdf_id, _ = ENVELOPE_HEADER.unpack_from(data)
+    cipher = next((c for c in Cipher if c.value.CIPHER_ID == cipher_id), None)
+    kdf = next((k for k in KDF if k.value.KDF_ID == kdf_id), None)
+    if cipher is None or kdf is None:
+        return None
+    return cipher, kdf
+
+
 if __name__ == "__main__":
     cipher = PBChaCha20()
     encrypted = cipher.encrypt(b"hello world", b"1234")
@@ -1,8 +1,12 @@
 """Args parsing for the CLI."""
 
+import base64
+import itertools
+import json
 import sys
+from functools import partial
 from pathlib import Path
-from typing import BinaryIO, cast
+from typing import BinaryIO, Iterator, TextIO, cast
 
 import click
 import cloup
@@ -11,14 +15,107 @@ import numpy as np
 from cloup.constraints import AnySet, If, require_all, require_one
 from PIL import ImageColor
 
-from .ciphers import KDF, Cipher
+from .batch import METHODS, decode_images, glob_images, read_manifest
+from .calibration import (
+    CONFIG_ENV, calibrate_argon2, calibrate_pbkdf2, config_path, configured_kdf,
+    measure, save_config,
+)
+from .ciphers import (
+    KDF, Cipher, KDFInterface, KeyCache, PBCipherInterface, identify, is_stream,
+)
+from .compression import Codec, choose_codec
+from .covers import CoverPool
+from .detect import describe
 from .encoders import DirectEncoder, LsbSteganographyEncoder
 from .image import Image
 from .image.text import (
-    create_colored_image, east_text_bbox, get_contour_color, hide_with_repeatation,
-    inpaint_bbox, put_text_in_bbox,
+    DnnBackend, DnnTarget, EastTextDetector, InpaintStrategy, create_colored_image,
+    east_text_bbox, east_text_bbox_batch, east_text_bbox_tiled, get_contour_color,
+    hide_with_repeatation, inpaint_bbox, put_text_in_bbox,
 )
 
+# Shared by every decode in the process, so images made with the same password and salt derive their key once.
+_KEY_CACHE = KeyCache()
+
+
+def _replace_text(
+    img_arr: np.ndarray,
+    bboxes: np.ndarray,
+    text: str,
+    count: int,
+    color: str | None,
+    font_scale: float,
+    thickness: int,
+    inpaint: InpaintStrategy = InpaintStrategy.AUTO,
+) -> np.ndarray:
+    """Inpaints up to `count` of the bboxes, and puts `text` in their place."""
+    bboxes = bboxes[:count]
+    if color is not None:
+        colors = [ImageColor.getrgb(color)] * len(bboxes)
+    else:
+        # Picked up from the text before it's inpainted.
+        colors = [
+            get_contour_color(img_arr[y : y + h, x : x + w])
+            for x, y, w, h in map(cv2.boundingRect, bboxes)
+        ]
+
+    img_arr = inpaint_bbox(img_arr, bboxes, strategy=inpaint)
+
+    pts: np.ndarray
+    for pts, rgb_color in zip(bboxes, colors):
+        img_arr = put_text_in_bbox(
+            img_arr,
+            text,
+            bbox=pts,
+            color=rgb_color,
+            fontScale=font_scale,
+            thickness=thickness,
+        )
+
+    return img_arr
+
+
+def _resolve_codec(compression: str, data: bytes) -> Codec:
+    if compression == "auto":
+        return choose_codec(data)
+    return Codec[compression.upper()]
+
+
+def _decrypt_chunks(
+    chunks: Iterator[bytes],
+    cipher: PBCipherInterface,
+    secret: bytes,
+    kdf: KDFInterface,
+) -> Iterator[bytes]:
+    """Decrypts data read in chunks, encrypted streams a segment at a time and anything else at once."""
+    first = next(chunks, b"")
+    if is_stream(first):
+        yield from cipher.decrypt_stream(itertools.chain([first], chunks), secret)
+    else:
+        yield cipher.decrypt(first + b"".join(chunks), secret=secret, kdf=kdf)
+
+
+def _is_std(path: Path | None) -> bool:
+    return path is not None and str(path) == "-"
+
+
+def _read_image(path: Path) -> Image:
+    """Reads an image from disk, or from stdin when `path` is `-`."""
+    if _is_std(path):
+        return Image.from_bytes(sys.stdin.buffer.read())
+    return Image.read(path)
+
+
+def _save_image(img: Image, path: Path, **kwargs) -> None:
+    """Saves an image to disk and reports where, or writes it to stdout as a PNG when `path` is `-`."""
+    if _is_std(path):
+        sys.stdout.buffer.write(img.to_bytes(".png", **kwargs))
+        return
+
+    img.save(path, **kwargs)
+    click.echo("Image saved to: ", sys.stderr, nl=False)
+    click.echo(path)
+
 
 @cloup.group(
     context_settings=dict(help_option_names=["-h", "--help"], show_default=True)
@@ -43,8 +140,9 @@ def app():
 @cloup.option(
     "-o",
     "--output",
-    type=cloup.Path(dir_okay=False),
+    type=cloup.Path(dir_okay=False, allow_dash=True),
     default=None,
+    help="Use `-` to write a PNG to stdout.",
 )
 def hide_text(
     secret: str,
@@ -63,7 +161,7 @@ def hide_text(
     rgb_img_color = ImageColor.getrgb(img_color)
 
     save_to = Path("output.png") if output is None else output
-    Image(
+    image = Image(
         hide_with_repeatation(
             create_colored_image(width, height, rgb_img_color),
             secret,
@@ -73,14 +171,16 @@ def hide_text(
             padding=cast(tuple[int, int], tuple(map(int, padding.split(",")[:2]))),
             trim_extra=trim_extra,
         )
-    ).save(save_to)
-
-    click.echo("Image saved to: ", sys.stderr, nl=False)
-    click.echo(save_to)
+    )
+    _save_image(image, save_to)
 
 
 @app.command("replace-text")
-@cloup.argument("img", type=cloup.Path(exists=True, dir_okay=False))
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, path_type=Path, allow_dash=True),
+    help="An image (`-` for stdin), or a directory of images to replace the text of in batches.",
+)
 @cloup.argument("text", type=str)
 @cloup.option(
     "-n", "--count", type=int, default=1, help="Number of times to replace image text."
@@ -88,6 +188,14 @@ def hide_text(
 @cloup.option("-c", "--color", type=str, default=None)
 @cloup.option("--font-scale", type=float, default=1)
 @cloup.option("--thickness", type=int, default=1)
+@cloup.option(
+    "--inpaint",
+    type=click.Choice([strategy.value for strategy in InpaintStrategy]),
+    default=InpaintStrategy.AUTO.value,
+    callback=lambda ctx, param, v: InpaintStrategy(v),
+    help="Inpaint each box within a padded region, or all of them in one pass. "
+    "`auto` picks by the number of boxes and the area covered.",
+)
 @cloup.option_group(
     "Pre-processing",
     cloup.option("-w", "--width", type=int, default=320),
@@ -97,12 +205,59 @@ def hide_text(
     "Text detection",
     cloup.option("--score-threshold", type=float, default=0.5),
     cloup.option("--nms-threshold", type=float, default=0.3),
+    cloup.option(
+        "--backend",
+        type=click.Choice(DnnBackend._member_names_, case_sensitive=False),
+        default=DnnBackend.DEFAULT.name,
+        callback=lambda ctx, param, v: DnnBackend._member_map_[v.upper()],
+    ),
+    cloup.option(
+        "--target",
+        type=click.Choice(DnnTarget._member_names_, case_sensitive=False),
+        default=DnnTarget.CPU.name,
+        callback=lambda ctx, param, v: DnnTarget._member_map_[v.upper()],
+    ),
+    cloup.option(
+        "--threads",
+        type=cloup.IntRange(1),
+        default=None,
+        help="Threads used for inference.  [default: OpenCV's choice]",
+    ),
+    cloup.option(
+        "--batch-size",
+        type=cloup.IntRange(1),
+        default=8,
+        help="Images detected in a single pass, when IMG is a directory.",
+    ),
+)
+@cloup.option_group(
+    "Tiling",
+    cloup.option(
+        "--tiled",
+        is_flag=True,
+        help="Detect overlapping tiles at the network's scale, instead of resizing the image to WIDTH x HEIGHT.",
+    ),
+    cloup.option("--tile-size", type=cloup.IntRange(32), default=320),
+    cloup.option("--overlap", type=cloup.IntRange(0), default=64),
+    cloup.option(
+        "--scales",
+        type=str,
+        default="1",
+        help="Comma separated factors the image is tiled at, e.g. `1, 0.25` to also find large text.",
+    ),
+    cloup.option(
+        "--tile-jobs",
+        type=cloup.IntRange(1),
+        default=1,
+        help="Threads decoding tiles while the next batch is detected.",
+    ),
 )
 @cloup.option(
     "-o",
     "--output",
-    type=cloup.Path(dir_okay=False),
+    type=cloup.Path(allow_dash=True),
     default=None,
+    help="Use `-` to write a PNG to stdout, a directory when IMG is one.",
 )
 def replace_text(
     img: Path,
@@ -111,50 +266,201 @@ def replace_text(
     color: str | None,
     font_scale: float,
     thickness: int,
+    inpaint: InpaintStrategy,
     width: int,
     height: int,
     score_threshold: float,
     nms_threshold: float,
+    backend: DnnBackend,
+    target: DnnTarget,
+    threads: int | None,
+    batch_size: int,
+    tiled: bool,
+    tile_size: int,
+    overlap: int,
+    scales: str,
+    tile_jobs: int,
     output: Path | None,
 ):
     """Replace text from an image."""
-    img_arr = Image.read(img).as_array()
-    bboxes = east_text_bbox(
-        img_arr,
-        pp_width=width,
-        pp_height=height,
+    if img.is_dir():
+        if _is_std(output):
+            raise click.UsageError("A directory of images can't be written to stdout.")
+        paths = Image.glob(img)
+        # Each output is named after its image, checked before the model is loaded.
+        names = [path.stem for path in paths]
+        if len(set(names)) < len(names):
+            raise click.UsageError(
+                "The images have clashing names, their outputs would overwrite each other."
+            )
+
+    detector = EastTextDetector.shared(backend, target, threads)
+    detect_tiled = partial(
+        east_text_bbox_tiled,
+        tile_size=tile_size,
+        overlap=overlap,
+        scales=[float(scale) for scale in scales.split(",")],
         score_threshold=score_threshold,
         nms_threshold=nms_threshold,
+        batch_size=batch_size,
+        workers=tile_jobs,
+        detector=detector,
+    )
+    replace = partial(
+        _replace_text,
+        text=text,
+        count=count,
+        color=color,
+        font_scale=font_scale,
+        thickness=thickness,
+        inpaint=inpaint,
     )
 
-    if color is not None:
-        rgb_color = ImageColor.getrgb(color)
+    if not img.is_dir():
+        img_arr = _read_image(img).as_array()
+        bboxes = (
+            detect_tiled(img_arr)
+            if tiled
+            else east_text_bbox(
+                img_arr,
+                pp_width=width,
+                pp_height=height,
+                score_threshold=score_threshold,
+                nms_threshold=nms_threshold,
+                detector=detector,
+            )
+        )
 
-    pts: np.ndarray
-    for _, pts in zip(range(count), bboxes):
-        if color is None:
-            x, y, w, h = cv2.boundingRect(pts)
-            cropped = img_arr[y : y + h, x : x + w]
-            rgb_color = get_contour_color(cropped)
+        save_to = Path("output.png") if output is None else output
+        _save_image(Image(replace(img_arr, bboxes)), save_to)
+        return
 
-        img_arr = inpaint_bbox(img_arr, np.array([pts], dtype=pts.dtype))
+    save_to = Path("output") if output is None else Path(output)
+    save_to.mkdir(parents=True, exist_ok=True)
 
-        img_arr = put_text_in_bbox(
-            img_arr,
-            text,
-            bbox=pts,
-            color=rgb_color,
-            fontScale=font_scale,
-            thickness=thickness,
+    # Read a batch at a time, so only `batch_size` images are held at once.
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start : start + batch_size]
+        imgs = [Image.read(path).as_array() for path in batch]
+        # Tiles are batched within each image instead.
+        all_bboxes = (
+            [detect_tiled(img_arr) for img_arr in imgs]
+            if tiled
+            else east_text_bbox_batch(
+                imgs,
+                pp_width=width,
+                pp_height=height,
+                score_threshold=score_threshold,
+                nms_threshold=nms_threshold,
+                batch_size=batch_size,
+                detector=detector,
+            )
         )
+        for path, img_arr, bboxes in zip(batch, imgs, all_bboxes):
+            Image(replace(img_arr, bboxes)).save(save_to / f"{path.stem}.png")
 
-    save_to = Path("output.png") if output is None else output
-    Image(img_arr).save(save_to)
-
-    click.echo("Image saved to: ", sys.stderr, nl=False)
+    click.echo(f"{len(paths)} image(s) saved to: ", sys.stderr, nl=False)
     click.echo(save_to)
 
 
+@app.command("capacity")
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, dir_okay=False, allow_dash=True),
+    help="An image, or `-` to read it from stdin.",
+)
+@cloup.option(
+    "-b",
+    "--bits-per-channel",
+    type=cloup.IntRange(1, LsbSteganographyEncoder.MAX_BITS_PER_CHANNEL),
+    default=None,
+    help="Only report the capacity for this depth.",
+)
+def capacity(img: Path, bits_per_channel: int | None):
+    """Reports the maximum number of bytes an image can hide utilizing Steganography."""
+    shape, _ = Image.probe(sys.stdin.buffer.read() if _is_std(img) else img)
+    depths = (
+        range(1, LsbSteganographyEncoder.MAX_BITS_PER_CHANNEL + 1)
+        if bits_per_channel is None
+        else (bits_per_channel,)
+    )
+
+    for depth in depths:
+        click.echo(
+            f"{depth} bit(s) per channel: "
+            f"{LsbSteganographyEncoder.capacity(shape, depth)} bytes"
+        )
+
+
+@app.command("kdf-bench")
+@cloup.option(
+    "--kdf",
+    type=click.Choice(KDF._member_names_, case_sensitive=False),
+    default=None,
+    callback=lambda ctx, param, v: KDF._member_map_[v] if v else None,
+    help="Only calibrate this KDF.  [default: all]",
+)
+@cloup.option(
+    "-t",
+    "--target-ms",
+    type=cloup.IntRange(1),
+    default=500,
+    help="How long deriving a key should take, in milliseconds.",
+)
+@cloup.option(
+    "-m",
+    "--max-memory",
+    type=cloup.IntRange(1),
+    default=64,
+    help="The most memory Argon2 may use, in MiB.",
+)
+@cloup.option(
+    "-p",
+    "--parallelism",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Argon2 lanes.  [default: number of CPUs, up to 4]",
+)
+@cloup.option(
+    "--save",
+    is_flag=True,
+    help="Save the parameters, encryption then uses them instead of the defaults. "
+    f"They're saved to ${CONFIG_ENV} if set.",
+)
+def kdf_bench(
+    kdf: KDF | None,
+    target_ms: int,
+    max_memory: int,
+    parallelism: int | None,
+    save: bool,
+):
+    """Measures how long the KDFs take on this machine, and recommends parameters for a target latency."""
+    target = target_ms / 1000
+    recommended: dict[KDF, KDFInterface] = {}
+    for member in KDF if kdf is None else (kdf,):
+        if member is KDF.PBKDF2:
+            instance = calibrate_pbkdf2(target)
+            details = f"iterations={instance.iterations}"
+        else:
+            instance = calibrate_argon2(target, max_memory * 1024, parallelism)
+            details = (
+                f"time_cost={instance.time_cost}, "
+                f"memory_cost={instance.memory_cost} KiB, "
+                f"parallelism={instance.parallelism}"
+            )
+        default = measure(member.value())
+        click.echo(
+            f"{member.name}: {details} "
+            f"({measure(instance) * 1000:.0f} ms, default {default * 1000:.0f} ms)"
+        )
+        recommended[member] = instance
+
+    if save:
+        click.echo(f"Saved to: {save_config(recommended)}")
+    else:
+        click.echo(f"Pass --save to use these when encrypting, see {config_path()}")
+
+
 @app.group()
 def encode():
     """Encode text within an image."""
@@ -177,11 +483,63 @@ def decode():
 @cloup.option(
     "-o",
     "--output",
-    type=cloup.Path(dir_okay=False),
+    type=cloup.Path(dir_okay=False, allow_dash=True),
     default=None,
+    help="Use `-` to write a PNG to stdout.",
 )
 @cloup.option("-w", "--width-limit", type=int, default=None)
 @cloup.option("-c", "--channels", type=int, default=3)
+@cloup.option(
+    "-z",
+    "--compression",
+    type=click.Choice([*(codec.name.lower() for codec in Codec), "auto"]),
+    default="none",
+    help="Compress the data before encoding, `auto` picks a codec by sampling the data.",
+)
+@cloup.option_group(
+    "Framing",
+    cloup.option(
+        "--framed",
+        is_flag=True,
+        help="Store the data in a seekable container with per-chunk checksums.",
+    ),
+    cloup.option("--chunk-size", type=cloup.IntRange(1), default=64 * 1024),
+)
+@cloup.option_group(
+    "Splitting",
+    cloup.option("--max-width", type=cloup.IntRange(1), default=None),
+    cloup.option("--max-height", type=cloup.IntRange(1), default=None),
+    cloup.option(
+        "-j",
+        "--jobs",
+        type=cloup.IntRange(1),
+        default=None,
+        help="Worker processes used for splitting.  [default: CPU count]",
+    ),
+    help="Split the output into a directory of images no larger than the maximum dimensions.",
+)
+@cloup.constraint(
+    If(AnySet("max_width", "max_height"), then=require_all),
+    ["max_width", "max_height"],
+)
+@cloup.option(
+    "--stream",
+    is_flag=True,
+    help="Encode the input file in chunks, writing a `.png` or `.npy` row by row.",
+)
+@cloup.option_group(
+    "Saving",
+    cloup.option("--png-level", type=cloup.IntRange(0, 9), default=None),
+    cloup.option(
+        "--fast-save", is_flag=True, help="Write larger files, but much faster."
+    ),
+    cloup.option(
+        "--save-jobs",
+        type=cloup.IntRange(1),
+        default=1,
+        help="Threads used to deflate a PNG.",
+    ),
+)
 @cloup.option_group(
     "Encryption",
     cloup.option("-e", "--encrypt", is_flag=True),
@@ -212,12 +570,62 @@ def encode_direct(
     output: Path | None,
     width_limit: int | None,
     channels: int,
+    compression: str,
+    framed: bool,
+    chunk_size: int,
+    max_width: int | None,
+    max_height: int | None,
+    jobs: int | None,
+    stream: bool,
+    png_level: int | None,
+    fast_save: bool,
+    save_jobs: int,
     encrypt: bool,
     key: str | None,
     cipher: Cipher | None,
     kdf: KDF | None,
 ):
     """Encodes data into an image by utilizing the pixel channels to store each byte of the data."""
+    save_to = Path("output.png") if output is None else Path(output)
+
+    if stream and (file is None or compression != "none" or _is_std(output)):
+        raise click.UsageError(
+            "--stream requires --file, and doesn't support compression or stdout."
+        )
+
+    if encrypt:
+        cipher = Cipher.ChaCha20 if cipher is None else cipher
+        kdf = KDF.Argon2 if kdf is None else kdf
+        key = (
+            click.prompt("Password Key", hide_input=True, confirmation_prompt=True)
+            if key is None and encrypt
+            else key
+        )
+
+    if stream:
+        assert file is not None
+        transform = None
+        if encrypt:
+            # Encrypted a segment at a time, so only one is held in memory.
+            transform = partial(
+                cipher.value().encrypt_stream,
+                secret=key.encode(),
+                kdf=configured_kdf(kdf),
+            )
+        try:
+            DirectEncoder(
+                width_limit=width_limit,
+                channels=channels,
+                framed=framed,
+                chunk_size=chunk_size,
+            ).encode_stream(file, save_to, transform=transform)
+        finally:
+            file.close()
+
+        click.echo("Image saved to: ", sys.stderr, nl=False)
+        click.echo(save_to)
+        return
+
     if text is not None:
         data = text.encode()
     else:
@@ -229,35 +637,63 @@ def encode_direct(
             raise e
 
     if encrypt:
-        cipher = Cipher.ChaCha20 if cipher is None else cipher
-        kdf = KDF.Argon2 if kdf is None else kdf
-        key = (
-            click.prompt("Password Key", hide_input=True, confirmation_prompt=True)
-            if key is None and encrypt
-            else key
+        data = cipher.value().encrypt(
+            data, secret=key.encode(), kdf=configured_kdf(kdf)
         )
 
-        data = cipher.value().encrypt(data, secret=key.encode(), kdf=kdf.value())
-
-    image = Image.encode(
-        DirectEncoder(data=data, width_limit=width_limit, channels=channels)
+    encoder = DirectEncoder(
+        data=data,
+        width_limit=width_limit,
+        channels=channels,
+        framed=framed,
+        chunk_size=chunk_size,
+        compression=_resolve_codec(compression, data),
     )
 
-    save_to = Path("output.png") if output is None else output
-    image.save(save_to)
+    if max_width is not None and max_height is not None:
+        if _is_std(output):
+            raise click.UsageError("Split parts can't be written to stdout.")
+        save_to = Path("output") if output is None else save_to
+        parts = encoder.encode_split(save_to, max_width, max_height, max_workers=jobs)
 
-    click.echo("Image saved to: ", sys.stderr, nl=False)
-    click.echo(save_to)
+        click.echo(f"{len(parts)} part(s) saved to: ", sys.stderr, nl=False)
+        click.echo(save_to)
+        return
+
+    _save_image(
+        Image.encode(encoder),
+        save_to,
+        level=png_level,
+        fast=fast_save,
+        workers=save_jobs,
+    )
 
 
 @decode.command("direct")
-@cloup.argument("img", type=cloup.Path(exists=True, dir_okay=False))
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, path_type=Path, allow_dash=True),
+    help="An image (`-` for stdin), or a directory of parts to reassemble the data from.",
+)
 @cloup.option(
     "-o",
     "--output",
     type=cloup.File("wb"),
     default=None,
 )
+@cloup.option(
+    "-j",
+    "--jobs",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Worker processes used for reassembling parts.  [default: CPU count]",
+)
+@cloup.option_group(
+    "Random access",
+    cloup.option("--offset", type=cloup.IntRange(0), default=None),
+    cloup.option("--length", type=cloup.IntRange(0), default=None),
+    help="Read only a byte range of the data, requires a framed image.",
+)
 @cloup.option_group(
     "Encryption",
     cloup.option("-d", "--decrypt", is_flag=True),
@@ -285,13 +721,35 @@ def encode_direct(
 def decode_direct(
     img: Path,
     output: BinaryIO | None,
+    jobs: int | None,
+    offset: int | None,
+    length: int | None,
     decrypt: bool,
     key: str | None,
     cipher: Cipher | None,
     kdf: KDF | None,
 ):
     """Decodes data from an image."""
-    data = Image.read(img).decode(DirectEncoder())
+    chunks: Iterator[bytes]
+    if img.is_dir():
+        chunks = iter([DirectEncoder().decode_split(Image.glob(img), max_workers=jobs)])
+    elif offset is None and length is None:
+        # Read incrementally, so encrypted streams are verified and written out as they're read.
+        chunks = DirectEncoder().iter_data(_read_image(img).as_array())
+    else:
+        img_arr = _read_image(img).as_array()
+        encoder = DirectEncoder()
+        if not encoder.is_framed(img_arr):
+            raise click.ClickException("Random access requires a framed image.")
+        chunks = iter(
+            [
+                encoder.read_range(
+                    img_arr,
+                    0 if offset is None else offset,
+                    encoder.read_frame_header(img_arr)[1] if length is None else length,
+                )
+            ]
+        )
 
     if decrypt:
         cipher = Cipher.ChaCha20 if cipher is None else cipher
@@ -302,25 +760,128 @@ def decode_direct(
             else key
         )
 
-        try:
-            data = cipher.value().decrypt(data, secret=key.encode(), kdf=kdf.value())
-        except Exception as e:
-            click.echo(f"Error: {repr(e)}", sys.stderr)
-            sys.exit(1)
+        chunks = _decrypt_chunks(
+            chunks, cipher.value(key_cache=_KEY_CACHE), key.encode(), kdf.value()
+        )
 
     if output is None:
         click.echo("Decoded data:", sys.stderr)
-        sys.stdout.buffer.write(data)
+    try:
+        for chunk in chunks:
+            (sys.stdout.buffer if output is None else output).write(chunk)
+    except Exception as e:
+        if output is not None:
+            output.close()
+        if not decrypt:
+            raise e
+        click.echo(f"Error: {repr(e)}", sys.stderr)
+        sys.exit(1)
+
+
+@decode.command("auto")
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, path_type=Path, allow_dash=True),
+    help="An image (`-` for stdin), or a directory of split parts or shards.",
+)
+@cloup.option(
+    "-o",
+    "--output",
+    type=cloup.File("wb"),
+    default=None,
+)
+@cloup.option(
+    "-j",
+    "--jobs",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Worker processes used for reassembling parts or shards.  [default: CPU count]",
+)
+@cloup.option(
+    "-k",
+    "--key",
+    type=str,
+    default=None,
+    help="Only used when the data is encrypted, prompted for if needed.",
+)
+def decode_auto(
+    img: Path,
+    output: BinaryIO | None,
+    jobs: int | None,
+    key: str | None,
+):
+    """Decodes data from an image, telling how it was encoded and encrypted from its headers."""
+    paths = Image.glob(img) if img.is_dir() else [img]
+    if not paths:
+        raise click.ClickException("There are no images to decode.")
+    img_arr = _read_image(paths[0]).as_array()
+    try:
+        method, bits_per_channel, codec, _, _ = describe(img_arr)
+    except Exception as e:
+        raise click.ClickException(str(e))
+
+    chunks: Iterator[bytes]
+    if img.is_dir():
+        if method == "direct-split":
+            data = DirectEncoder().decode_split(paths, max_workers=jobs)
+        elif method == "steganography-sharded":
+            data = LsbSteganographyEncoder().decode_sharded(paths, max_workers=jobs)
+        else:
+            raise click.ClickException(
+                f"{paths[0]} isn't one of several images the data was split across."
+            )
+        chunks = iter([data])
+    elif method == "direct":
+        chunks = DirectEncoder().iter_data(img_arr)
+    elif method == "steganography":
+        chunks = iter([LsbSteganographyEncoder().decode(img_arr)])
     else:
-        try:
-            output.write(data)
-        except Exception as e:
+        raise click.ClickException(
+            "The data is split across images, decode their directory instead."
+        )
+
+    # The cipher is told again from the decoded data, the headers may not have let `describe` peek far enough,
+    # e.g. for bz2 or a part other than the first.
+    first = next(chunks, b"")
+    chunks = itertools.chain([first], chunks)
+    recorded = identify(first)
+    cipher, kdf = (None, None) if recorded is None else recorded
+
+    details = [method.split("-")[0]]
+    if bits_per_channel is not None:
+        details.append(f"{bits_per_channel} bit(s) per channel")
+    if codec is not Codec.NONE:
+        details.append(codec.name.lower())
+    if cipher is not None and kdf is not None:
+        details.append(f"{cipher.name} with {kdf.name}")
+    click.echo(f"Detected: {', '.join(details)}", sys.stderr)
+
+    if cipher is not None and kdf is not None:
+        key = click.prompt("Password Key", hide_input=True) if key is None else key
+        chunks = _decrypt_chunks(
+            chunks, cipher.value(key_cache=_KEY_CACHE), key.encode(), kdf.value()
+        )
+
+    if output is None:
+        click.echo("Decoded data:", sys.stderr)
+    try:
+        for chunk in chunks:
+            (sys.stdout.buffer if output is None else output).write(chunk)
+    except Exception as e:
+        if output is not None:
             output.close()
+        if cipher is None:
             raise e
+        click.echo(f"Error: {repr(e)}", sys.stderr)
+        sys.exit(1)
 
 
 @encode.command("steganography")
-@cloup.argument("img", type=cloup.Path(exists=True, dir_okay=False))
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, path_type=Path, allow_dash=True),
+    help="A cover image (`-` for stdin), or a directory of covers to shard the data across.",
+)
 @cloup.option_group(
     "Input",
     cloup.option("-t", "--text", type=str),
@@ -330,8 +891,53 @@ def decode_direct(
 @cloup.option(
     "-o",
     "--output",
-    type=cloup.Path(dir_okay=False),
+    type=cloup.Path(dir_okay=False, allow_dash=True),
     default=None,
+    help="Use `-` to write a PNG to stdout.",
+)
+@cloup.option(
+    "-b",
+    "--bits-per-channel",
+    type=cloup.IntRange(1, LsbSteganographyEncoder.MAX_BITS_PER_CHANNEL),
+    default=1,
+)
+@cloup.option(
+    "--band-rows",
+    type=cloup.IntRange(1),
+    default=1024,
+    help="Rows embedded at a time when the output is a memory-mapped `.npy` file.",
+)
+@cloup.option(
+    "-j",
+    "--jobs",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Worker processes used for sharding.  [default: CPU count]",
+)
+@cloup.option(
+    "--best-fit",
+    is_flag=True,
+    help="Pick the smallest cover from the IMG directory that fits, instead of sharding.",
+)
+@cloup.option(
+    "-z",
+    "--compression",
+    type=click.Choice([*(codec.name.lower() for codec in Codec), "auto"]),
+    default="none",
+    help="Compress the data before encoding, `auto` picks a codec by sampling the data.",
+)
+@cloup.option_group(
+    "Saving",
+    cloup.option("--png-level", type=cloup.IntRange(0, 9), default=None),
+    cloup.option(
+        "--fast-save", is_flag=True, help="Write larger files, but much faster."
+    ),
+    cloup.option(
+        "--save-jobs",
+        type=cloup.IntRange(1),
+        default=1,
+        help="Threads used to deflate a PNG.",
+    ),
 )
 @cloup.option_group(
     "Encryption",
@@ -362,12 +968,25 @@ def encode_steganography(
     file: BinaryIO | None,
     img: Path,
     output: Path | None,
+    bits_per_channel: int,
+    band_rows: int,
+    jobs: int | None,
+    best_fit: bool,
+    compression: str,
+    png_level: int | None,
+    fast_save: bool,
+    save_jobs: int,
     encrypt: bool,
     key: str | None,
     cipher: Cipher | None,
     kdf: KDF | None,
 ):
     """Encodes data into an image utilizing Steganography."""
+    if _is_std(img) and file is not None and file.name == "<stdin>":
+        raise click.UsageError(
+            "The cover image and the data can't both come from stdin."
+        )
+
     if text is not None:
         data = text.encode()
     else:
@@ -387,27 +1006,84 @@ def encode_steganography(
             else key
         )
 
-        data = cipher.value().encrypt(data, secret=key.encode(), kdf=kdf.value())
+        data = cipher.value().encrypt(
+            data, secret=key.encode(), kdf=configured_kdf(kdf)
+        )
 
-    image = Image.encode(
-        LsbSteganographyEncoder(data=data, img=Image.read(img).as_array())
+    encoder = LsbSteganographyEncoder(
+        data=data,
+        bits_per_channel=bits_per_channel,
+        compression=_resolve_codec(compression, data),
     )
+    if img.is_dir() and best_fit:
+        cover = CoverPool(img).best_fit(len(encoder.stored_data()), bits_per_channel)
+        if cover is None:
+            raise click.ClickException("None of the covers can fit the data.")
+        click.echo(f"Using cover: {cover}", sys.stderr)
+        img = cover
 
-    save_to = Path("output.png") if output is None else output
-    image.save(save_to)
+    if img.is_dir():
+        save_to = Path("output") if output is None else Path(output)
+        shards = encoder.encode_sharded(Image.glob(img), save_to, max_workers=jobs)
 
-    click.echo("Image saved to: ", sys.stderr, nl=False)
-    click.echo(save_to)
+        click.echo(f"{len(shards)} shard(s) saved to: ", sys.stderr, nl=False)
+        click.echo(save_to)
+        return
+
+    source = sys.stdin.buffer.read() if _is_std(img) else img
+    # Check the fit from the header alone, before decoding the whole cover.
+    try:
+        shape, _ = Image.probe(source)
+    except Exception:
+        shape = None
+    if shape is not None and len(encoder.stored_data()) > encoder.capacity(
+        shape, bits_per_channel
+    ):
+        raise click.ClickException(
+            f"Can't fit {len(encoder.stored_data())} bytes within the image, "
+            f"it can hold {encoder.capacity(shape, bits_per_channel)} bytes."
+        )
+    cover = (
+        Image.from_bytes(source) if isinstance(source, bytes) else Image.read(source)
+    ).as_array()
+    encoder.img = cover
+
+    save_to = Path("output.png") if output is None else Path(output)
+    if save_to.suffix == ".npy":
+        encoder.encode_tiled(save_to, band_rows=band_rows)
+
+        click.echo("Image saved to: ", sys.stderr, nl=False)
+        click.echo(save_to)
+    else:
+        # The cover isn't needed afterwards, so it's embedded in-place unless it's a read-only memory map.
+        _save_image(
+            encoder.encode(out=cover if cover.flags.writeable else None),
+            save_to,
+            level=png_level,
+            fast=fast_save,
+            workers=save_jobs,
+        )
 
 
 @decode.command("steganography")
-@cloup.argument("img", type=cloup.Path(exists=True, dir_okay=False))
+@cloup.argument(
+    "img",
+    type=cloup.Path(exists=True, path_type=Path, allow_dash=True),
+    help="An image (`-` for stdin), or a directory of shards to reassemble the data from.",
+)
 @cloup.option(
     "-o",
     "--output",
     type=cloup.File("wb"),
     default=None,
 )
+@cloup.option(
+    "-j",
+    "--jobs",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Worker processes used for reassembling shards.  [default: CPU count]",
+)
 @cloup.option_group(
     "Encryption",
     cloup.option("-d", "--decrypt", is_flag=True),
@@ -435,13 +1111,19 @@ def encode_steganography(
 def decode_steganography(
     img: Path,
     output: BinaryIO | None,
+    jobs: int | None,
     decrypt: bool,
     key: str | None,
     cipher: Cipher | None,
     kdf: KDF | None,
 ):
     """Decodes data from an image utilizing Steganography."""
-    data = Image.read(img).decode(LsbSteganographyEncoder())
+    if img.is_dir():
+        data = LsbSteganographyEncoder().decode_sharded(
+            Image.glob(img), max_workers=jobs
+        )
+    else:
+        data = _read_image(img).decode(LsbSteganographyEncoder())
 
     if decrypt:
         cipher = Cipher.ChaCha20 if cipher is None else cipher
@@ -453,7 +1135,9 @@ def decode_steganography(
         )
 
         try:
-            data = cipher.value().decrypt(data, secret=key.encode(), kdf=kdf.value())
+            data = cipher.value(key_cache=_KEY_CACHE).decrypt(
+                data, secret=key.encode(), kdf=kdf.value()
+            )
         except Exception as e:
             click.echo(f"Error: {repr(e)}", sys.stderr)
             sys.exit(1)
@@ -467,3 +1151,134 @@ def decode_steganography(
         except Exception as e:
             output.close()
             raise e
+
+
+@decode.command("batch")
+@cloup.argument(
+    "pattern",
+    type=str,
+    required=False,
+    help="A glob of images, quote it so the shell doesn't expand it. `**` matches any directories.",
+)
+@cloup.option(
+    "--manifest",
+    type=cloup.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="A file listing an image per line, instead of PATTERN.",
+)
+@cloup.option(
+    "-m",
+    "--method",
+    type=click.Choice([*METHODS, "auto"]),
+    default="direct",
+    help="How the images were encoded, `auto` tells from each image's headers.",
+)
+@cloup.option_group(
+    "Output",
+    cloup.option(
+        "-o",
+        "--output-dir",
+        type=cloup.Path(file_okay=False, path_type=Path),
+        help="Write the data of each image to `<name>.bin` within this directory.",
+    ),
+    cloup.option(
+        "--jsonl",
+        type=cloup.File("w"),
+        help="Write a line of JSON per image, with its path and either its base64 data or error.",
+    ),
+    constraint=require_one,
+)
+@cloup.option(
+    "-j",
+    "--jobs",
+    type=cloup.IntRange(1),
+    default=None,
+    help="Worker processes used for decoding.  [default: CPU count]",
+)
+@cloup.option_group(
+    "Encryption",
+    cloup.option("-d", "--decrypt", is_flag=True),
+    cloup.option("-k", "--key", type=str, default=None),
+    cloup.option(
+        "--cipher",
+        type=click.Choice(Cipher._member_names_, case_sensitive=False),
+        default=None,
+        callback=lambda ctx, param, v: Cipher._member_map_[v] if v else None,
+    ),
+    cloup.option(
+        "--kdf",
+        type=click.Choice(KDF._member_names_, case_sensitive=False),
+        default=None,
+        callback=lambda ctx, param, v: KDF._member_map_[v] if v else None,
+    ),
+)
+@cloup.constraint(
+    If(
+        AnySet("key", "cipher", "kdf"),
+        then=require_all,
+    ),
+    ["decrypt"],
+)
+def decode_batch(
+    pattern: str | None,
+    manifest: Path | None,
+    method: str,
+    output_dir: Path | None,
+    jsonl: TextIO | None,
+    jobs: int | None,
+    decrypt: bool,
+    key: str | None,
+    cipher: Cipher | None,
+    kdf: KDF | None,
+):
+    """Decodes many images in parallel, reporting the ones which fail without stopping."""
+    if (pattern is None) == (manifest is None):
+        raise click.UsageError("Pass exactly one of PATTERN or --manifest.")
+    paths = glob_images(pattern) if manifest is None else read_manifest(manifest)
+    if not paths:
+        raise click.ClickException("No images to decode.")
+
+    if output_dir is not None:
+        names = [path.stem for path in paths]
+        if len(set(names)) < len(names):
+            raise click.UsageError(
+                "The images have clashing names, use --jsonl instead of --output-dir."
+            )
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    secret = None
+    if decrypt:
+        cipher = Cipher.ChaCha20 if cipher is None else cipher
+        kdf = KDF.Argon2 if kdf is None else kdf
+        secret = (
+            click.prompt("Password Key", hide_input=True) if key is None else key
+        ).encode()
+
+    failed = 0
+    for path, data, error in decode_images(
+        paths,
+        method,
+        secret,
+        Cipher.ChaCha20 if cipher is None else cipher,
+        KDF.Argon2 if kdf is None else kdf,
+        max_workers=jobs,
+    ):
+        if error is not None:
+            failed += 1
+            click.echo(f"Failed: {path}: {error}", sys.stderr)
+
+        if jsonl is not None:
+            record = {
+                "path": str(path),
+                "data": None if data is None else base64.b64encode(data).decode(),
+                "error": error,
+            }
+            jsonl.write(json.dumps(record) + "\n")
+            jsonl.flush()
+        elif data is not None:
+            assert output_dir is not None
+            (output_dir / f"{path.stem}.bin").write_bytes(data)
+
+    click.echo(f"{len(paths) - failed} decoded, {failed} failed.", sys.stderr)
+    if failed:
+        sys.exit(1)
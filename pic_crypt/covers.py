@@ -0,0 +1,98 @@
+import bisect
+import json
+from pathlib import Path
+
+from .encoders import LsbSteganographyEncoder
+from .image import Image
+
+
+class CoverPool:
+    """
+    A directory of cover images, indexed by their steganography capacity.
+
+    The index is kept on disk in `INDEX_NAME` within the directory, an image is only probed again when its
+    mtime or size changes. If the directory isn't writable, the index is only kept in memory.
+
+    ```py
+    pool = CoverPool(Path("covers"))
+    cover = pool.best_fit(len(data), bits_per_channel=2)
+    ```
+    """
+
+    INDEX_NAME = ".pic-crypt-covers.json"
+    INDEX_VERSION = 2
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.index_path = self.directory / self.INDEX_NAME
+        self.entries: dict[str, dict] = {}
+        self._capacities: list[int] = []
+        self._names: list[str] = []
+
+        self._load()
+        self.refresh()
+
+    def _load(self) -> None:
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return
+        if index.get("version") == self.INDEX_VERSION:
+            self.entries = index["entries"]
+
+    def _save(self) -> None:
+        try:
+            self.index_path.write_text(
+                json.dumps({"version": self.INDEX_VERSION, "entries": self.entries})
+            )
+        except OSError:
+            # e.g. a read-only directory, the index is then only kept in memory.
+            pass
+
+    def refresh(self) -> None:
+        """Probes new or modified images, drops removed ones and saves the index if anything changed."""
+        entries = {}
+        changed = False
+        for path in Image.glob(self.directory):
+            stat = path.stat()
+            entry = self.entries.get(path.name)
+            if (
+                entry is None
+                or entry["mtime_ns"] != stat.st_mtime_ns
+                or entry["size"] != stat.st_size
+            ):
+                try:
+                    shape, _ = Image.probe(path)
+                except Exception:
+                    continue
+                entry = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "shape": list(shape),
+                    # Payload bits at 1 bit per channel, scaled by the depth in `best_fit`.
+                    "capacity_bits": LsbSteganographyEncoder.payload_channels(shape),
+                }
+                changed = True
+            entries[path.name] = entry
+
+        changed = changed or entries.keys() != self.entries.keys()
+        self.entries = entries
+        if changed:
+            self._save()
+
+        ordered = sorted(
+            (entry["capacity_bits"], name) for name, entry in entries.items()
+        )
+        self._capacities = [capacity for capacity, _ in ordered]
+        self._names = [name for _, name in ordered]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def best_fit(self, data_len: int, bits_per_channel: int = 1) -> Path | None:
+        """Returns the smallest cover which can hold `data_len` bytes, or `None` if none can."""
+        required_bits = -(-data_len * 8 // bits_per_channel)
+        i = bisect.bisect_left(self._capacities, required_bits)
+        if i == len(self._names):
+            return None
+        return self.directory / self._names[i]
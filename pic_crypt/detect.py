@@ -0,0 +1,76 @@
+"""
+Tells how an image was encoded, and how its data was encrypted, by reading only the headers.
+
+Every layer records itself: framed direct images begin with `DirectEncoder.FRAME_MAGIC`, steganography images with
+`LsbSteganographyEncoder.HEADER_MAGIC` followed by their depth and codec, and encrypted data with its cipher and KDF
+ids, see `pic_crypt.ciphers`. So nothing has to be guessed and no key is derived just to find a wrong guess.
+Only data compressed with a block codec, e.g. bz2, is read in full, as nothing of it decompresses before that.
+
+```py
+method, bits_per_channel, codec, cipher, kdf = describe(Image.read(path).as_array())
+```
+"""
+
+import sys
+
+import numpy as np
+
+from .ciphers import ENVELOPE_HEADER, KDF, Cipher, identify
+from .compression import Codec, decompress_head
+from .encoders import SPLIT_HEADER, DirectEncoder, LsbSteganographyEncoder
+
+# Stored bytes read to find the envelope header, enough to decompress it from the start of any codec's stream.
+PEEK_SIZE = 1024
+
+Description = tuple[str, int | None, Codec, Cipher | None, KDF | None]
+
+
+def describe(img: np.ndarray) -> Description:
+    """
+    Returns `(method, bits_per_channel, codec, cipher, kdf)` for an image.
+
+    - `method` is `direct` or `steganography`, or `direct-split` and `steganography-sharded` for one of several
+    images the data was split across, which are decoded together.
+    - `bits_per_channel` is `None` for direct images.
+    - `cipher` and `kdf` are `None` when the data isn't encrypted, and for any split image but the first.
+    A split image's own bytes may not decompress far enough to tell either, so identify reassembled data again.
+    - Images with no headers to go by are taken as unframed, unencrypted direct images, which is how `encode
+    direct` writes by default. Steganography predating `HEADER_MAGIC` can't be told apart from them.
+    """
+    head = img.reshape(-1)[:PEEK_SIZE].tobytes()
+    bits_per_channel: int | None = None
+    encoder: DirectEncoder | LsbSteganographyEncoder | None = None
+    if DirectEncoder.is_framed(img):
+        method, split_magic = "direct", DirectEncoder.PART_MAGIC
+        encoder = DirectEncoder()
+        stored, codec = encoder.peek(img, PEEK_SIZE)
+    elif LsbSteganographyEncoder.has_magic(img):
+        method, split_magic = "steganography", LsbSteganographyEncoder.SHARD_MAGIC
+        encoder = LsbSteganographyEncoder()
+        bits_per_channel = encoder.read_header(img)[0]
+        stored, codec = encoder.peek(img, PEEK_SIZE)
+    else:
+        # Unframed, the data is stored as is, an envelope records its cipher.
+        method, split_magic = "direct", b""
+        stored, codec = head, Codec.NONE
+
+    if split_magic and stored.startswith(split_magic):
+        method = {"direct": "direct-split", "steganography": "steganography-sharded"}[
+            method
+        ]
+        _, index, *_ = SPLIT_HEADER.unpack_from(stored)
+        # Only the first part holds the start of the data.
+        stored = stored[SPLIT_HEADER.size :] if index == 0 else b""
+
+    head = decompress_head(stored, codec, PEEK_SIZE) if stored else b""
+    if (
+        len(head) < ENVELOPE_HEADER.size
+        and codec is not Codec.NONE
+        and encoder is not None
+        and method in ("direct", "steganography")
+    ):
+        # Block codecs, e.g. bz2, output nothing until a whole block is read, so decompress all of it.
+        head = decompress_head(encoder.peek(img, sys.maxsize)[0], codec, PEEK_SIZE)
+    recorded = identify(head)
+    cipher, kdf = (None, None) if recorded is None else recorded
+    return method, bits_per_channel, codec, cipher, kdf
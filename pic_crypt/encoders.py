@@ -1,9 +1,92 @@
+import io
 import math
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Sequence, cast
 
 import numpy as np
-from bitarray import bitarray
 
+from . import memory
+from .compression import Codec, compress, decompress
 from .image import EncoderInterface, Image
+from .image.stream import open_row_writer
+
+# magic, part index, part count, payload length, payload crc32, part crc32
+SPLIT_HEADER = struct.Struct(">4sIIQII")
+# Bytes of data unpacked to bits at a time by `lsb_embed`, divisible by every depth up to 4.
+EMBED_BLOCK_SIZE = 12 << 16
+
+
+def _split_headers(magic: bytes, data: bytes, chunks: Sequence[bytes]) -> list[bytes]:
+    """Returns the `SPLIT_HEADER` of each part the data was split into."""
+    payload_crc = zlib.crc32(data)
+    return [
+        SPLIT_HEADER.pack(
+            magic, i, len(chunks), len(data), payload_crc, zlib.crc32(chunk)
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def _join_parts(parts: Sequence[tuple[Path, bytes, Codec]], magic: bytes) -> bytes:
+    """
+    Reassembles data split into parts beginning with `SPLIT_HEADER`, given in any order.
+
+    Each part also records the codec that the joined data was compressed with.
+    """
+    chunks: dict[int, bytes] = {}
+    expected = None
+    for path, part, codec in parts:
+        if len(part) < SPLIT_HEADER.size or part[: len(magic)] != magic:
+            raise Exception(f"{path} doesn't contain a part of split data.")
+
+        _, index, *payload_info, part_crc = SPLIT_HEADER.unpack_from(part)
+        chunk = part[SPLIT_HEADER.size :]
+        if zlib.crc32(chunk) != part_crc:
+            raise Exception(f"Corrupted part: {path}")
+
+        payload_info.append(codec)
+        if expected is None:
+            expected = payload_info
+        elif payload_info != expected:
+            raise Exception("The parts belong to different payloads.")
+        chunks[index] = chunk
+
+    if expected is None:
+        raise Exception("There are no parts to decode.")
+
+    count, data_len, payload_crc, codec = expected
+    missing = sorted(set(range(count)) - chunks.keys())
+    if missing:
+        raise Exception(f"Missing parts: {missing}")
+
+    data = b"".join(chunks[i] for i in range(count))
+    if len(data) != data_len or zlib.crc32(data) != payload_crc:
+        raise Exception("Corrupted split data.")
+
+    return decompress(data, codec)
+
+
+def _encode_part(
+    part: bytes,
+    codec: Codec,
+    output: Path,
+    width_limit: int,
+    channels: int,
+    chunk_size: int,
+) -> Path:
+    DirectEncoder(width_limit=width_limit, channels=channels)._encode_bytes(
+        *DirectEncoder._frame_pieces(part, chunk_size, codec)
+    ).save(output)
+    return output
+
+
+def _decode_part(path: Path) -> tuple[Path, bytes, Codec]:
+    return path, *DirectEncoder()._decode_stored(Image.read(path).as_array())
 
 
 class DirectEncoder(EncoderInterface):
@@ -11,111 +94,828 @@ class DirectEncoder(EncoderInterface):
     An Encoder which utilizes the pixel channels to store each byte of the data.
 
     - When `width_limit` is set to `None`, it will generate an image with dimensions as close as possible to a square.
+    - When `framed` is set, the data is stored in a seekable container, see `frame`.
+    - Compressed data is always framed, since the codec is recorded in the frame header.
+    - So is data beginning with `FRAME_MAGIC`, which would otherwise be taken for a frame when decoded.
     """
 
+    FRAME_MAGIC = b"PCDF"
+    FRAME_VERSION = 2
+    # magic, version, chunk size, payload length, chunk count, codec
+    FRAME_HEADER = struct.Struct(">4sBIQIB")
+    # Version 1 frames have no codec and are never compressed.
+    FRAME_HEADER_V1 = struct.Struct(">4sBIQI")
+
+    PART_MAGIC = b"PCDP"
+
     def __init__(
         self,
         data: bytes | None = None,
         *,
         width_limit: int | None = None,
         channels: int = 3,
+        framed: bool = False,
+        chunk_size: int = 64 * 1024,
+        compression: Codec = Codec.NONE,
     ):
         self.data = data
         self.width_limit = width_limit
         self.channels = channels
+        self.framed = framed
+        self.chunk_size = chunk_size
+        self.compression = compression
 
-    def encode(self) -> Image:
-        """Encodes data into an image by utilizing the pixel channels to store each byte of the data."""
-        if self.data is None:
-            raise Exception("There's no data to encode.")
+    @classmethod
+    def frame(cls, data: bytes, chunk_size: int, codec: Codec = Codec.NONE) -> bytes:
+        """
+        Wraps data in the framed container format.
+
+        The container is laid out as `FRAME_HEADER`, an index holding the crc32 of each chunk as big-endian u32s,
+        followed by the data itself, split into chunks of `chunk_size` bytes (the last one may be shorter).
+        """
+        return b"".join(cls._frame_pieces(data, chunk_size, codec))
+
+    @classmethod
+    def _frame_pieces(
+        cls, data: bytes, chunk_size: int, codec: Codec
+    ) -> tuple[bytes, bytes]:
+        """Returns the frame prefix and the data, so they can be written out without being concatenated."""
+        view = memoryview(data)
+        crcs = [
+            zlib.crc32(view[i : i + chunk_size])
+            for i in range(0, len(data), chunk_size)
+        ]
+        return cls._frame_prefix(crcs, len(data), chunk_size, codec), data
 
-        image = np.frombuffer(self.data, dtype=np.uint8)
+    @classmethod
+    def _frame_prefix(
+        cls, crcs: Sequence[int], data_len: int, chunk_size: int, codec: Codec
+    ) -> bytes:
+        """Returns the frame header and index, which precede the data."""
+        header = cls.FRAME_HEADER.pack(
+            cls.FRAME_MAGIC,
+            cls.FRAME_VERSION,
+            chunk_size,
+            data_len,
+            len(crcs),
+            codec.value,
+        )
+        return header + np.array(crcs, dtype=">u4").tobytes()
 
+    def _shape(self, length: int) -> tuple[int, int, int]:
+        """Returns the dimensions of the image needed to store `length` bytes."""
         height = (
-            math.ceil(abs(len(self.data) / (self.width_limit * self.channels)))
+            math.ceil(abs(length / (self.width_limit * self.channels)))
             if self.width_limit
-            else math.ceil(abs(math.sqrt(len(self.data) / self.channels)))
+            else math.ceil(abs(math.sqrt(length / self.channels)))
             if self.width_limit is None
             else 1
         )
-        width = math.ceil(abs(len(self.data) / (height * self.channels)))
-        channels = abs(self.channels)
+        width = math.ceil(abs(length / (height * self.channels)))
+        return height, width, abs(self.channels)
+
+    def encode(self, out: np.ndarray | None = None) -> Image:
+        """
+        Encodes data into an image by utilizing the pixel channels to store each byte of the data.
+
+        The image is written into `out` when given, which must be a writable, C-contiguous uint8 array with the
+        shape from `shape`. Otherwise a new array is allocated, or the data itself is viewed if no padding is needed.
+        """
+        if self.data is None:
+            raise Exception("There's no data to encode.")
+
+        return self._encode_bytes(*self._pieces(), out=out)
+
+    def _pieces(self) -> tuple[bytes, ...]:
+        """Returns the bytes stored in the image, in order."""
+        assert self.data is not None
+        if (
+            self.framed
+            or self.compression is not Codec.NONE
+            or self.data.startswith(self.FRAME_MAGIC)
+        ):
+            with memory.stage("compress"):
+                stored = compress(self.data, self.compression)
+            return self._frame_pieces(stored, self.chunk_size, self.compression)
+        return (self.data,)
+
+    def shape(self) -> tuple[int, int, int]:
+        """Returns the shape of the image `encode` produces, e.g. for preallocating its output."""
+        if self.data is None:
+            raise Exception("There's no data to encode.")
+        return self._shape(sum(map(len, self._pieces())))
+
+    def _encode_bytes(self, *pieces: bytes, out: np.ndarray | None = None) -> Image:
+        length = sum(map(len, pieces))
+        shape = self._shape(length)
 
-        pad_count = height * width * channels - len(self.data)
-        if pad_count:
-            padding = np.zeros((pad_count,), dtype=np.uint8)
-            image = np.concatenate((image, padding))
+        if out is None and len(pieces) == 1 and math.prod(shape) == length:
+            # The data fills the image exactly, so it can be viewed as is.
+            return Image(img=np.frombuffer(pieces[0], dtype=np.uint8).reshape(shape))
 
-        return Image(img=image.reshape(height, width, channels))
+        if out is not None and (out.shape != shape or out.dtype != np.uint8):
+            raise ValueError(f"{out.shape=}, expected a uint8 array of shape {shape}.")
+        if out is not None and not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("`out` must be a writable, C-contiguous array.")
+
+        with memory.stage("direct.image"):
+            if out is None:
+                out = np.empty(shape, dtype=np.uint8)
+            flat = out.reshape(-1)  # a view, as `out` is contiguous
+            pos = 0
+            for piece in pieces:
+                flat[pos : pos + len(piece)] = np.frombuffer(piece, dtype=np.uint8)
+                pos += len(piece)
+            flat[pos:] = 0
+
+        return Image(img=out)
+
+    def encode_split(
+        self,
+        output_dir: Path,
+        max_width: int,
+        max_height: int,
+        max_workers: int | None = None,
+    ) -> list[Path]:
+        """
+        Splits the data across as many PNGs as needed to keep each within `max_width` x `max_height`.
+
+        - The data is compressed as a whole before being split.
+        - Each part is a framed image beginning with a `SPLIT_HEADER`, see `decode_split`.
+        - Parts are encoded and saved in parallel in a process pool.
+        """
+        if self.data is None:
+            raise Exception("There's no data to encode.")
+        data = compress(self.data, self.compression)
+
+        capacity = max_width * max_height * abs(self.channels)
+        room = (
+            capacity
+            - self.FRAME_HEADER.size
+            - 4 * -(-capacity // self.chunk_size)
+            - SPLIT_HEADER.size
+        )
+        if room <= 0:
+            raise Exception("The maximum dimensions are too small to hold any data.")
+
+        count = max(-(-len(data) // room), 1)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        chunks = [data[i * room : (i + 1) * room] for i in range(count)]
+        headers = _split_headers(self.PART_MAGIC, data, chunks)
+
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = []
+            for i, (header, chunk) in enumerate(zip(headers, chunks)):
+                futures.append(
+                    executor.submit(
+                        _encode_part,
+                        header + chunk,
+                        self.compression,
+                        output_dir / f"part-{i:04}.png",
+                        max_width,
+                        self.channels,
+                        self.chunk_size,
+                    )
+                )
+
+            return [future.result() for future in futures]
+
+    def decode_split(
+        self, paths: Sequence[Path], max_workers: int | None = None
+    ) -> bytes:
+        """Reassembles data split by `encode_split` from its part images, given in any order."""
+        with ProcessPoolExecutor(max_workers) as executor:
+            parts = list(executor.map(_decode_part, paths))
+        return _join_parts(parts, self.PART_MAGIC)
+
+    def encode_stream(
+        self,
+        file: BinaryIO,
+        path: Path,
+        read_size: int = 1 << 20,
+        transform: Callable[[Iterator[bytes]], Iterable[bytes]] | None = None,
+    ) -> tuple[int, int, int]:
+        """
+        Encodes the rest of a binary file into an image at `path`, without holding the data in memory.
+
+        - `path` can be a `.png`, which is deflated row by row, or a `.npy`, which is written through a memory map.
+        - Non-seekable files, like stdin, are spooled to a temporary file first.
+        - `transform` maps the file's chunks to the chunks to store, e.g. `cipher.encrypt_stream`.
+          Its output is spooled to a temporary file.
+        - The data is read twice when framed, once for the chunk checksums and once for the pixels.
+        - Compression isn't supported, as the compressed size isn't known up front.
+
+        Returns the shape of the written image.
+        """
+        if self.compression is not Codec.NONE:
+            raise Exception("Compression isn't supported when streaming.")
+
+        if transform is None and file.seekable():
+            return self._encode_seekable(file, path, read_size)
+
+        with tempfile.TemporaryFile() as spool:
+            if transform is not None:
+                for piece in transform(iter(lambda: file.read(read_size), b"")):
+                    spool.write(piece)
+            else:
+                shutil.copyfileobj(file, spool, read_size)
+            spool.seek(0)
+            return self._encode_seekable(cast(BinaryIO, spool), path, read_size)
+
+    def _encode_seekable(
+        self, file: BinaryIO, path: Path, read_size: int
+    ) -> tuple[int, int, int]:
+        start = file.tell()
+        data_len = file.seek(0, io.SEEK_END) - start
+        file.seek(start)
+        framed = self.framed or file.read(len(self.FRAME_MAGIC)) == self.FRAME_MAGIC
+        file.seek(start)
+
+        prefix = b""
+        if framed:
+            crcs = [
+                zlib.crc32(file.read(self.chunk_size))
+                for _ in range(0, data_len, self.chunk_size)
+            ]
+            prefix = self._frame_prefix(crcs, data_len, self.chunk_size, Codec.NONE)
+            file.seek(start)
+
+        height, width, channels = self._shape(len(prefix) + data_len)
+        row_size = width * channels
+        rows_per_write = max(read_size // row_size, 1)
+
+        writer = open_row_writer(path, width, height, channels)
+        try:
+            pending = bytearray(prefix)
+            rows_written = 0
+            while rows_written < height:
+                while len(pending) < rows_per_write * row_size:
+                    chunk = file.read(read_size)
+                    if not chunk:
+                        break
+                    pending += chunk
+
+                count = min(len(pending) // row_size, height - rows_written)
+                if count == 0:
+                    # End of the data, pad the last row and any rows left with zeros.
+                    pending += bytes(row_size - len(pending) % row_size)
+                    count = min(len(pending) // row_size, height - rows_written)
+
+                rows = np.frombuffer(pending, dtype=np.uint8, count=count * row_size)
+                writer.write(rows.reshape(count, width, channels))
+                del rows
+                del pending[: count * row_size]
+                rows_written += count
+        finally:
+            writer.close()
+
+        return height, width, channels
+
+    @classmethod
+    def is_framed(cls, img: np.ndarray) -> bool:
+        return img.reshape(-1)[: len(cls.FRAME_MAGIC)].tobytes() == cls.FRAME_MAGIC
+
+    def read_frame_header(
+        self, img: np.ndarray
+    ) -> tuple[int, int, np.ndarray, int, Codec]:
+        """
+        Reads the header and index of a framed image.
+
+        Returns `(chunk_size, data_len, crcs, offset, codec)`, where `offset` is the byte where the data begins.
+        """
+        raw = img.reshape(-1)
+        if not self.is_framed(img) or len(raw) <= len(self.FRAME_MAGIC):
+            raise Exception("The image doesn't contain framed data.")
+
+        version = raw[len(self.FRAME_MAGIC)]
+        header_struct = {1: self.FRAME_HEADER_V1, 2: self.FRAME_HEADER}.get(version)
+        if header_struct is None:
+            raise Exception(f"{version=}, Unsupported frame version.")
+        if len(raw) < header_struct.size:
+            raise Exception("Corrupted frame header.")
+
+        _, _, chunk_size, data_len, count, *codec = header_struct.unpack(
+            raw[: header_struct.size].tobytes()
+        )
+        codec = Codec(codec[0]) if codec else Codec.NONE
+
+        offset = header_struct.size + count * 4
+        if (
+            chunk_size <= 0
+            or count != -(-data_len // chunk_size)
+            or offset + data_len > len(raw)
+        ):
+            raise Exception("Corrupted frame header.")
+
+        crcs = np.frombuffer(raw[header_struct.size : offset].tobytes(), ">u4")
+        return chunk_size, data_len, crcs, offset, codec
+
+    def verify_chunk(self, img: np.ndarray, index: int) -> bool:
+        """Checks a single chunk of a framed image against its crc32."""
+        chunk_size, data_len, crcs, offset, _ = self.read_frame_header(img)
+        if not 0 <= index < len(crcs):
+            raise Exception(f"{index=}, The image only has {len(crcs)} chunks.")
+        start = offset + index * chunk_size
+        chunk = img.reshape(-1)[start : min(start + chunk_size, offset + data_len)]
+        return zlib.crc32(chunk) == crcs[index]
+
+    def _read_stored_range(self, img: np.ndarray, start: int, length: int) -> bytes:
+        chunk_size, data_len, crcs, offset, _ = self.read_frame_header(img)
+        end = min(start + length, data_len)
+        if start >= end:
+            return b""
+
+        first, last = start // chunk_size, (end - 1) // chunk_size
+        begin = offset + first * chunk_size
+        chunks = img.reshape(-1)[
+            begin : offset + min((last + 1) * chunk_size, data_len)
+        ]
+        for i in range(first, last + 1):
+            chunk = chunks[(i - first) * chunk_size : (i - first + 1) * chunk_size]
+            if zlib.crc32(chunk) != crcs[i]:
+                raise Exception(f"Corrupted chunk: {i}")
+
+        skip = start - first * chunk_size
+        return chunks[skip : skip + end - start].tobytes()
+
+    def iter_data(self, img: np.ndarray, read_size: int = 1 << 20) -> Iterator[bytes]:
+        """
+        Yields the data of an image about `read_size` bytes at a time, so it can be processed while it's read.
+
+        - Framed images are verified a chunk at a time, compressed data is decompressed and yielded at once.
+        - Unframed images are yielded as is, including any padding.
+        - Only the pixels being yielded are paged in from a memory-mapped `.npy`, see `Image.read`.
+        """
+        if not self.is_framed(img):
+            raw = img.reshape(-1)
+            for start in range(0, len(raw), read_size):
+                yield raw[start : start + read_size].tobytes()
+            return
+
+        chunk_size, data_len, _, _, codec = self.read_frame_header(img)
+        if codec is not Codec.NONE:
+            yield decompress(*self._decode_stored(img))
+            return
+
+        step = max(read_size // chunk_size, 1) * chunk_size
+        for start in range(0, data_len, step):
+            yield self._read_stored_range(img, start, step)
+
+    def read_range(self, img: np.ndarray, start: int, length: int) -> bytes:
+        """
+        Reads `length` bytes of data beginning at `start` from a framed image.
+
+        Only the chunks overlapping the range are read and verified.
+        """
+        if self.read_frame_header(img)[4] is not Codec.NONE:
+            raise Exception("Random access isn't supported for compressed data.")
+        return self._read_stored_range(img, start, length)
+
+    def peek(self, img: np.ndarray, size: int) -> tuple[bytes, Codec]:
+        """Returns up to the first `size` bytes of the data as stored, along with the codec it was compressed with."""
+        if not self.is_framed(img):
+            return img.reshape(-1)[:size].tobytes(), Codec.NONE
+        return self._read_stored_range(img, 0, size), self.read_frame_header(img)[4]
+
+    def _decode_stored(self, img: np.ndarray) -> tuple[bytes, Codec]:
+        """Extracts the data of a framed image as stored, along with the codec it was compressed with."""
+        _, data_len, _, _, codec = self.read_frame_header(img)
+        return self._read_stored_range(img, 0, data_len), codec
 
     def decode(self, img: np.ndarray) -> bytes:
-        """Decodes data from an image."""
+        """
+        Decodes data from an image.
+
+        Framed images are verified, decompressed and returned without padding, others are returned as is.
+        """
+        if self.is_framed(img):
+            return decompress(*self._decode_stored(img))
         return img.tobytes()
 
 
+def lsb_embed(
+    channels: np.ndarray, data: bytes, offset: int = 0, bits_per_channel: int = 1
+) -> None:
+    """
+    Stores the bits of `data` in the low `bits_per_channel` bits of the channels, starting at channel `offset`.
+
+    - `channels` must be a flat array, it is modified in-place.
+    - Bits are written in big-endian order, the last channel is zero-padded if the bits don't divide evenly.
+    - The data is unpacked `EMBED_BLOCK_SIZE` bytes at a time, which bounds the memory used for its bits.
+    """
+    if offset + -(-len(data) * 8 // bits_per_channel) > len(channels):
+        raise ValueError("Not enough channels to store the data.")
+
+    view = memoryview(data)
+    for start in range(0, len(data), EMBED_BLOCK_SIZE):
+        bits = np.unpackbits(
+            np.frombuffer(view[start : start + EMBED_BLOCK_SIZE], dtype=np.uint8)
+        )
+        values = _channel_values(bits, bits_per_channel)
+
+        first = offset + start * 8 // bits_per_channel
+        _store_values(channels[first : first + len(values)], values, bits_per_channel)
+        # Freed before the next block is unpacked, so only one block of bits is held at a time.
+        del bits, values
+
+
+def lsb_embed_window(
+    channels: np.ndarray,
+    start: int,
+    data: bytes,
+    offset: int = 0,
+    bits_per_channel: int = 1,
+) -> None:
+    """
+    Same as `lsb_embed`, but `channels` is a window into a larger flat array, beginning at channel `start`.
+
+    Only the part of `data` which falls within the window is stored, so a large image can be embedded band by band.
+    """
+    total_bits = len(data) * 8
+    low = max(start, offset)
+    high = min(start + len(channels), offset + -(-total_bits // bits_per_channel))
+    if low >= high:
+        return
+
+    first_bit = (low - offset) * bits_per_channel
+    last_bit = min((high - offset) * bits_per_channel, total_bits)
+    chunk = np.frombuffer(data[first_bit // 8 : -(-last_bit // 8)], dtype=np.uint8)
+    bits = np.unpackbits(chunk)[first_bit % 8 :][: last_bit - first_bit]
+
+    _store_values(
+        channels[low - start : high - start],
+        _channel_values(bits, bits_per_channel),
+        bits_per_channel,
+    )
+
+
+def _channel_values(bits: np.ndarray, bits_per_channel: int) -> np.ndarray:
+    """Groups the bits into values of `bits_per_channel` bits each, zero-padding the last one."""
+    if bits_per_channel == 1:
+        return bits
+
+    # Packing a row of bits puts them in the high bits of a byte, so the values are shifted down after.
+    # The whole rows are packed from a view of the bits, only the last, partial, one is packed on its own.
+    whole = len(bits) // bits_per_channel * bits_per_channel
+    values = np.packbits(bits[:whole].reshape(-1, bits_per_channel), axis=1).reshape(-1)
+    if whole < len(bits):
+        values = np.append(values, np.packbits(bits[whole:]))
+    values >>= 8 - bits_per_channel
+    return values
+
+
+def _store_values(
+    target: np.ndarray, values: np.ndarray, bits_per_channel: int
+) -> None:
+    target &= ~np.array((1 << bits_per_channel) - 1, dtype=target.dtype)
+    target |= values
+
+
+def lsb_extract(
+    channels: np.ndarray, offset: int, count: int, bits_per_channel: int = 1
+) -> bytes:
+    """Reads `count` bytes from the low `bits_per_channel` bits of the channels, starting at channel `offset`."""
+    num_channels = -(-count * 8 // bits_per_channel)
+    values = channels[offset : offset + num_channels] & ((1 << bits_per_channel) - 1)
+    if bits_per_channel == 1:
+        bits = values.astype(np.uint8)
+    else:
+        shifts = np.arange(bits_per_channel - 1, -1, -1, dtype=values.dtype)
+        bits = ((values[:, None] >> shifts) & 1).astype(np.uint8).ravel()
+
+    return np.packbits(bits[: count * 8]).tobytes()
+
+
+def _encode_shard(
+    cover: Path, shard: bytes, output: Path, bits_per_channel: int, codec: Codec
+) -> Path:
+    img = Image.read(cover).as_array()
+    encoder = LsbSteganographyEncoder(img=img, bits_per_channel=bits_per_channel)
+    # The cover was read just for this shard, so it's embedded in-place unless it's a read-only memory map.
+    encoder._encode_stored(shard, codec, img if img.flags.writeable else None).save(
+        output
+    )
+    return output
+
+
+def _decode_shard(path: Path) -> tuple[Path, bytes, Codec]:
+    return path, *LsbSteganographyEncoder()._decode_stored(Image.read(path).as_array())
+
+
 class LsbSteganographyEncoder(EncoderInterface):
-    """An Encoder which utilizes LSB Steganography to encode data."""
+    """
+    An Encoder which utilizes LSB Steganography to encode data.
+
+    The image starts with a header stored at 1 bit per channel, followed by the payload:
+    - `HEADER_MAGIC`, so the image can be told apart from others, see `pic_crypt.detect`.
+    - A flag byte, `HEADER_FLAG | codec << 4 | bits_per_channel`, where `codec` is the compression codec id.
+    - The payload length in bytes, using as many bytes as needed to count the channels of the image.
+
+    Images without the magic are read as the older layouts, with just the flag byte and length, or
+    without the flag bit only the length and 1 bit per channel.
+    """
+
+    HEADER_MAGIC = b"PCL"
+    HEADER_FLAG = 0x80
+    CODEC_SHIFT = 4
+    DEPTH_MASK = 0x0F
+    MAX_BITS_PER_CHANNEL = 4
+
+    SHARD_MAGIC = b"PCSH"
 
     def __init__(
         self,
         data: bytes | None = None,
         img: np.ndarray | None = None,
+        *,
+        bits_per_channel: int = 1,
+        compression: Codec = Codec.NONE,
     ):
+        if not 1 <= bits_per_channel <= self.MAX_BITS_PER_CHANNEL:
+            raise ValueError(
+                f"{bits_per_channel=}, expected a value between 1 and {self.MAX_BITS_PER_CHANNEL}."
+            )
+
         self.data = data
         self.img = img
+        self.bits_per_channel = bits_per_channel
+        self.compression = compression
+        self._stored: bytes | None = None
+
+    @staticmethod
+    def _len_field_size(num_channels: int) -> int:
+        return (num_channels.bit_length() + 7) // 8
+
+    @classmethod
+    def _header(
+        cls, num_channels: int, data_len: int, bits_per_channel: int, codec: Codec
+    ) -> bytes:
+        flag = cls.HEADER_FLAG | codec.value << cls.CODEC_SHIFT | bits_per_channel
+        return (
+            cls.HEADER_MAGIC
+            + bytes([flag])
+            + data_len.to_bytes(cls._len_field_size(num_channels), "big")
+        )
+
+    @classmethod
+    def payload_channels(cls, shape: tuple[int, ...]) -> int:
+        """Returns the number of channels left for the payload in an image of the given `shape`."""
+        num_channels = math.prod(shape)
+        header_channels = (
+            len(cls.HEADER_MAGIC) + 1 + cls._len_field_size(num_channels)
+        ) * 8
+        return max(num_channels - header_channels, 0)
 
-    def encode(self) -> Image:
-        """Encodes data into an image by storing each bit of the data in the lsb bit of each channel."""
+    @classmethod
+    def capacity(cls, shape: tuple[int, ...], bits_per_channel: int = 1) -> int:
+        """Returns the maximum number of payload bytes that fit in an image of the given `shape`."""
+        return cls.payload_channels(shape) * bits_per_channel // 8
+
+    def stored_data(self) -> bytes:
+        """Returns the data as it will be embedded, i.e. compressed, the result is cached."""
         if self.data is None:
             raise Exception("There's no data to encode.")
+        if self._stored is None:
+            with memory.stage("compress"):
+                self._stored = compress(self.data, self.compression)
+        return self._stored
+
+    def _encode_stored(
+        self, stored: bytes, codec: Codec, out: np.ndarray | None = None
+    ) -> Image:
+        """Embeds already compressed data, recording `codec` in the header."""
         if self.img is None:
             raise Exception("There's no image to encode data to.")
 
-        channels = self.img.flatten()
-        bytes_for_data_bits = (len(channels).bit_length() + 7) // 8
+        if len(stored) > self.capacity(self.img.shape, self.bits_per_channel):
+            raise Exception(
+                "Can't fit the data within the image with the current implementation."
+            )
 
-        data = self.data
-        data = len(data).to_bytes(bytes_for_data_bits, "big") + data
-        data_bits = bitarray()
-        data_bits.frombytes(data)
+        if out is not None:
+            if out.shape != self.img.shape or out.dtype != self.img.dtype:
+                raise ValueError(
+                    f"{out.shape=}, expected an array of shape {self.img.shape} and dtype {self.img.dtype}."
+                )
+            if not (out.flags.c_contiguous and out.flags.writeable):
+                raise ValueError("`out` must be a writable, C-contiguous array.")
 
-        if len(data_bits) > len(channels):  # Each channel can store 1 bit of the data
+        with memory.stage("lsb.copy"):
+            if out is None:
+                out = self.img.copy()
+            elif out is not self.img:
+                np.copyto(out, self.img)
+
+        channels = out.reshape(-1)  # a view, as `out` is contiguous
+        header = self._header(len(channels), len(stored), self.bits_per_channel, codec)
+
+        with memory.stage("lsb.embed"):
+            lsb_embed(channels, header)
+            lsb_embed(channels, stored, len(header) * 8, self.bits_per_channel)
+
+        return Image(img=out)
+
+    def encode(self, out: np.ndarray | None = None) -> Image:
+        """
+        Encodes data into an image by storing the bits of the data in the low bits of each channel.
+
+        The image is written into `out` when given, which must be a writable, C-contiguous array shaped like the
+        cover. Pass the cover itself to encode in-place, without copying it.
+        """
+        return self._encode_stored(self.stored_data(), self.compression, out)
+
+    def encode_tiled(self, path: Path, band_rows: int = 1024) -> Image:
+        """
+        Encodes data into a memory-mapped `.npy` file at `path`, one band of `band_rows` rows at a time.
+
+        - The cover is only read band by band, so it can be a memory-mapped image, see `Image.read`.
+        - Memory use is bounded by the size of a band rather than the size of the image.
+        """
+        if self.img is None:
+            raise Exception("There's no image to encode data to.")
+
+        stored = self.stored_data()
+        shape = self.img.shape
+        if len(stored) > self.capacity(shape, self.bits_per_channel):
             raise Exception(
                 "Can't fit the data within the image with the current implementation."
             )
 
-        for i in range(channels.shape[0]):
-            try:
-                channels[i] = (channels[i] & ~1) | data_bits.pop(0)
-            except IndexError:
-                break
+        header = self._header(
+            math.prod(shape), len(stored), self.bits_per_channel, self.compression
+        )
+        row_channels = math.prod(shape[1:])
+
+        output = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.img.dtype, shape=shape
+        )
+        for row in range(0, shape[0], band_rows):
+            band = output[row : row + band_rows]
+            band[...] = self.img[row : row + band_rows]
+
+            channels = band.reshape(-1)
+            start = row * row_channels
+            lsb_embed_window(channels, start, header)
+            lsb_embed_window(
+                channels, start, stored, len(header) * 8, self.bits_per_channel
+            )
+            output.flush()
+        del output
+
+        return Image.read(path)
 
-        return Image(img=channels.reshape(self.img.shape))
+    def encode_sharded(
+        self,
+        covers: Sequence[Path],
+        output_dir: Path,
+        max_workers: int | None = None,
+    ) -> list[Path]:
+        """
+        Splits the data across as many of the `covers` as needed, in order, and saves each shard as a PNG.
+
+        - The data is compressed as a whole before being split, every shard records the codec.
+        - Each shard begins with a `SPLIT_HEADER` holding its index and crc32.
+        - Shards are embedded and saved in parallel in a process pool.
+        """
+        data = self.stored_data()
+        # Only the headers are read to size the covers, the pixels are decoded by the workers.
+        capacities = (
+            self.capacity(Image.probe(cover)[0], self.bits_per_channel)
+            for cover in covers
+        )
+
+        with ProcessPoolExecutor(max_workers) as executor:
+            plan: list[tuple[Path, int, int]] = []
+            pos = 0
+            for cover, capacity in zip(covers, capacities):
+                if plan and pos >= len(data):
+                    break
+                room = capacity - SPLIT_HEADER.size
+                if room <= 0:
+                    continue
+                plan.append((cover, pos, min(pos + room, len(data))))
+                pos = plan[-1][2]
+
+            if not plan or pos < len(data):
+                raise Exception("Can't fit the data within the cover images.")
+
+            output_dir = Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            chunks = [data[start:end] for _, start, end in plan]
+            headers = _split_headers(self.SHARD_MAGIC, data, chunks)
+
+            futures = []
+            for i, (cover, header, chunk) in enumerate(
+                zip((cover for cover, _, _ in plan), headers, chunks)
+            ):
+                futures.append(
+                    executor.submit(
+                        _encode_shard,
+                        cover,
+                        header + chunk,
+                        output_dir / f"{i:04}-{cover.stem}.png",
+                        self.bits_per_channel,
+                        self.compression,
+                    )
+                )
+
+            return [future.result() for future in futures]
+
+    def decode_sharded(
+        self, paths: Sequence[Path], max_workers: int | None = None
+    ) -> bytes:
+        """Reassembles data split by `encode_sharded` from its shard images, given in any order."""
+        with ProcessPoolExecutor(max_workers) as executor:
+            shards = list(executor.map(_decode_shard, paths))
+        return _join_parts(shards, self.SHARD_MAGIC)
+
+    @staticmethod
+    def _leading_channels(img: np.ndarray, count: int) -> np.ndarray:
+        """
+        Returns a flat array holding at least the first `count` channels of the image.
+
+        Only the rows containing those channels are touched, for a memory-mapped image the rest is never read.
+        """
+        rows = -(-count // math.prod(img.shape[1:]))
+        return img[:rows].reshape(-1)
+
+    @classmethod
+    def has_magic(cls, img: np.ndarray) -> bool:
+        """Returns whether the image begins with `HEADER_MAGIC`, i.e. it was encoded by this encoder."""
+        count = len(cls.HEADER_MAGIC) * 8
+        if math.prod(img.shape) < count:
+            return False
+        return (
+            lsb_extract(cls._leading_channels(img, count), 0, len(cls.HEADER_MAGIC))
+            == cls.HEADER_MAGIC
+        )
+
+    def read_header(self, img: np.ndarray) -> tuple[int, int, int, Codec]:
+        """
+        Reads the header from the first few pixels of an image.
+
+        Returns `(bits_per_channel, data_len, offset, codec)`, where `offset` is the channel where the payload begins.
+        """
+        len_field_size = self._len_field_size(math.prod(img.shape))
+        magic_size = len(self.HEADER_MAGIC)
+        channels = self._leading_channels(img, (magic_size + 1 + len_field_size) * 8)
+
+        offset = magic_size * 8 if self.has_magic(img) else 0
+        flag = lsb_extract(channels, offset, 1)[0]
+        if flag & self.HEADER_FLAG:
+            bits_per_channel = flag & self.DEPTH_MASK
+            codec_id = (flag & ~self.HEADER_FLAG) >> self.CODEC_SHIFT
+            offset += 8
+        else:
+            bits_per_channel = 1
+            codec_id = Codec.NONE.value
+            offset = 0
+
+        if not 1 <= bits_per_channel <= self.MAX_BITS_PER_CHANNEL or codec_id not in (
+            codec.value for codec in Codec
+        ):
+            raise Exception("Corrupted steganography header.")
 
-    def decode(self, img: np.ndarray) -> bytes:
-        """Decodes data from an image by taking the lsb bits of the channels."""
-        channels = img.flatten()
-        bytes_for_data_bits = (len(channels).bit_length() + 7) // 8
-        data_len_bits = bitarray()
-        for lv in channels[: bytes_for_data_bits * 8]:
-            data_len_bits.append(lv & 1)
         data_len = int.from_bytes(
-            data_len_bits.tobytes(), "big"
+            lsb_extract(channels, offset, len_field_size), "big"
         )  # number of bytes in data
 
-        data = bitarray()
-        for lv in channels[
-            bytes_for_data_bits * 8 : bytes_for_data_bits * 8 + data_len * 8
-        ]:
-            data.append(lv & 1)
+        return bits_per_channel, data_len, offset + len_field_size * 8, Codec(codec_id)
+
+    def peek(self, img: np.ndarray, size: int) -> tuple[bytes, Codec]:
+        """Returns up to the first `size` bytes of the payload as stored, and the codec it was compressed with."""
+        bits_per_channel, data_len, offset, codec = self.read_header(img)
+        count = min(size, data_len)
+        end = min(offset + -(-count * 8 // bits_per_channel), math.prod(img.shape))
+        stored = lsb_extract(
+            self._leading_channels(img, end), offset, count, bits_per_channel
+        )
+        return stored, codec
+
+    def _decode_stored(self, img: np.ndarray) -> tuple[bytes, Codec]:
+        """Extracts the payload as stored, along with the codec it was compressed with."""
+        bits_per_channel, data_len, offset, codec = self.read_header(img)
+        end = min(offset + -(-data_len * 8 // bits_per_channel), math.prod(img.shape))
 
-        return data.tobytes()
+        stored = lsb_extract(
+            self._leading_channels(img, end), offset, data_len, bits_per_channel
+        )
+        return stored, codec
+
+    def decode(self, img: np.ndarray) -> bytes:
+        """
+        Decodes data from an image by taking the low bits of the channels.
+
+        Only the channels holding the header and the payload are read, not the whole image.
+        """
+        return decompress(*self._decode_stored(img))
 
 
 if __name__ == "__main__":
     # Example
-    from pathlib import Path
-
     direct_encoder = DirectEncoder(b"Hello, World!", width_limit=2, channels=4)
     Image.encode(direct_encoder).save(Path("text_encoder_output.png"))
     print(Image.read(Path("text_encoder_output.png")).decode(direct_encoder).decode())
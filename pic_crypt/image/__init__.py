@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import io
 from pathlib import Path
-from typing import Protocol
+from typing import BinaryIO, Protocol
 
 import cv2
 import numpy as np
 
+from .probe import probe
+from .stream import write_png_parallel
+
+DEFAULT_PNG_LEVEL = 1  # same as cv2.imwrite
+TIFF_COMPRESSION_NONE = 1
+NPY_MAGIC = b"\x93NUMPY"
+
 
 class EncoderInterface(Protocol):
     """A standardized interface for encoding data within images."""
@@ -18,6 +26,14 @@ class EncoderInterface(Protocol):
         """An interface method for decoding data from an image."""
         ...
 
+    def encode_to_bytes(self, format: str = ".png", **kwargs) -> bytes:
+        """Encodes data into an image and returns the image file's bytes, see `Image.to_bytes`."""
+        return self.encode().to_bytes(format, **kwargs)
+
+    def decode_from_bytes(self, data: bytes) -> bytes:
+        """Decodes data from the bytes of an image file, see `Image.from_bytes`."""
+        return self.decode(Image.from_bytes(data).as_array())
+
 
 class Image:
     """A basic image class that implements fundamental methods."""
@@ -40,12 +56,128 @@ class Image:
 
     @classmethod
     def read(cls, path: Path) -> Image:
-        """A method to read an image from disk and create an Image object."""
+        """
+        A method to read an image from disk and create an Image object.
+
+        - `.npy` files are memory-mapped read-only instead of being loaded into memory.
+        """
+        if Path(path).suffix == ".npy":
+            return cls(img=np.load(path, mmap_mode="r"))
         return cls(img=cv2.imread(str(path), cv2.IMREAD_UNCHANGED))
 
-    def save(self, path: Path) -> None:
-        """A method for saving an image to disk."""
-        cv2.imwrite(str(path), self.img)
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Image:
+        """Decodes an image from the bytes of an image file, in any format `Image.read` supports."""
+        if data.startswith(NPY_MAGIC):
+            return cls(img=np.load(io.BytesIO(data)))
+
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise Exception("Couldn't decode the image.")
+        return cls(img=img)
+
+    @staticmethod
+    def probe(path: Path | bytes) -> tuple[tuple[int, ...], np.dtype]:
+        """
+        Returns the shape and dtype of an image on disk, or of an image file's bytes, by only parsing its header.
+
+        Much faster than `Image.read` when the pixels aren't needed, e.g. for capacity checks.
+        Supports PNG, JPEG, TIFF, WebP and `.npy`, anything else raises an `Exception`.
+        """
+        return probe(path)
+
+    @staticmethod
+    def glob(directory: Path) -> list[Path]:
+        """Returns the readable images within a directory, sorted by name."""
+        return sorted(
+            path
+            for path in Path(directory).iterdir()
+            if path.is_file()
+            and (path.suffix == ".npy" or cv2.haveImageReader(str(path)))
+        )
+
+    def save(
+        self,
+        path: Path,
+        *,
+        level: int | None = None,
+        strategy: int | None = None,
+        fast: bool = False,
+        workers: int = 1,
+    ) -> None:
+        """
+        A method for saving an image to disk, the format is picked by the extension of `path`.
+
+        - `level` is the PNG compression level (0-9) and `strategy` one of `cv2.IMWRITE_PNG_STRATEGY_*`.
+        - `fast` trades file size for speed: PNGs and TIFFs are written uncompressed, unless `level` is given.
+        - With more than one worker, or at level 0, a PNG is written by `write_png_parallel` instead of OpenCV.
+          It skips PNG filtering and deflates blocks of rows in parallel, `strategy` doesn't apply to it.
+        - WebP is always written lossless, as the pixels carry data.
+        """
+        suffix = Path(path).suffix.lower()
+        if suffix == ".npy":
+            np.save(path, self.img)
+            return
+
+        with open(path, "wb") as file:
+            self._write(file, suffix, level, strategy, fast, workers)
+
+    def to_bytes(
+        self,
+        format: str = ".png",
+        *,
+        level: int | None = None,
+        strategy: int | None = None,
+        fast: bool = False,
+        workers: int = 1,
+    ) -> bytes:
+        """Encodes the image in memory, `format` is a file extension, same options as `Image.save`."""
+        buffer = io.BytesIO()
+        if format.lower() == ".npy":
+            np.save(buffer, self.img)
+        else:
+            self._write(buffer, format.lower(), level, strategy, fast, workers)
+        return buffer.getvalue()
+
+    def _write(
+        self,
+        file: BinaryIO,
+        suffix: str,
+        level: int | None,
+        strategy: int | None,
+        fast: bool,
+        workers: int,
+    ) -> None:
+        if fast and level is None:
+            level = 0
+
+        # OpenCV refuses 2-channel images, which `write_png_parallel` can't write either.
+        if (
+            suffix == ".png"
+            and (workers > 1 or level == 0)
+            and self.img.dtype == np.uint8
+            and self.img.shape[2] != 2
+        ):
+            write_png_parallel(
+                file, self.img, DEFAULT_PNG_LEVEL if level is None else level, workers
+            )
+            return
+
+        params = []
+        if suffix == ".png":
+            if level is not None:
+                params += [cv2.IMWRITE_PNG_COMPRESSION, level]
+            if strategy is not None:
+                params += [cv2.IMWRITE_PNG_STRATEGY, strategy]
+        elif suffix == ".webp":
+            params += [cv2.IMWRITE_WEBP_QUALITY, 101]  # > 100 is lossless
+        elif suffix in (".tif", ".tiff") and fast:
+            params += [cv2.IMWRITE_TIFF_COMPRESSION, TIFF_COMPRESSION_NONE]
+
+        success, encoded = cv2.imencode(suffix, self.img, params)
+        if not success:
+            raise Exception(f"Couldn't encode the image as {suffix}")
+        file.write(encoded.data)
 
     def as_array(self) -> np.ndarray:
         return self.img
@@ -0,0 +1,138 @@
+"""Reads the dimensions of an image from its header, without decoding any pixels."""
+
+import io
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+# Enough for the headers of every format but TIFF and JPEG, which seek to their headers.
+_HEAD_SIZE = 64
+
+
+def _probe_png(file: BinaryIO, head: bytes) -> tuple[tuple[int, int, int], np.dtype]:
+    width, height, bit_depth, color_type = struct.unpack_from(">IIBB", head, 16)
+
+    channels = {0: 1, 2: 3, 4: 4, 6: 4}.get(color_type)
+    if color_type == 3:
+        # Palettes are expanded to BGR, or BGRA when they have transparency.
+        channels = 3
+        file.seek(33)
+        while chunk := file.read(8):
+            length, kind = struct.unpack(">I4s", chunk)
+            if kind == b"tRNS":
+                channels = 4
+            if kind in (b"tRNS", b"IDAT", b"IEND"):
+                break
+            file.seek(length + 4, 1)
+    if channels is None:
+        raise Exception(f"{color_type=}, Unknown PNG color type.")
+
+    return (height, width, channels), np.dtype(
+        np.uint16 if bit_depth == 16 else np.uint8
+    )
+
+
+def _probe_jpeg(file: BinaryIO) -> tuple[tuple[int, int, int], np.dtype]:
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise Exception("Couldn't find the JPEG frame header.")
+        if marker[1] in (0x01, *range(0xD0, 0xD8)):  # markers without a length
+            continue
+
+        (length,) = struct.unpack(">H", file.read(2))
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            _, height, width, components = struct.unpack(">BHHB", file.read(6))
+            # CMYK is converted to BGR.
+            return (height, width, 1 if components == 1 else 3), np.dtype(np.uint8)
+        file.seek(length - 2, 1)
+
+
+def _probe_tiff(file: BinaryIO, head: bytes) -> tuple[tuple[int, int, int], np.dtype]:
+    order = "<" if head[:2] == b"II" else ">"
+    (ifd_offset,) = struct.unpack_from(order + "I", head, 4)
+
+    file.seek(ifd_offset)
+    (count,) = struct.unpack(order + "H", file.read(2))
+    entries = [struct.unpack(order + "HHI4s", file.read(12)) for _ in range(count)]
+
+    tags = {}
+    for tag, kind, values, field in entries:
+        # Only the first value of a tag is needed: SHORTs or LONGs.
+        fmt = order + ("H" if kind == 3 else "I")
+        if values * struct.calcsize(fmt) > 4:
+            # The values don't fit in the entry, the field holds their offset.
+            file.seek(struct.unpack(order + "I", field)[0])
+            field = file.read(4)
+        tags[tag] = struct.unpack_from(fmt, field)[0]
+
+    if 256 not in tags or 257 not in tags:
+        raise Exception("The TIFF is missing its dimensions.")
+
+    bits = tags.get(258, 1)
+    sample_format = tags.get(339, 1)
+    dtype = {
+        (8, 1): np.uint8,
+        (8, 2): np.int8,
+        (16, 1): np.uint16,
+        (16, 2): np.int16,
+        (32, 2): np.int32,
+        (32, 3): np.float32,
+        (64, 3): np.float64,
+    }.get((bits, sample_format), np.uint8)
+
+    return (tags[257], tags[256], tags.get(277, 1)), np.dtype(dtype)
+
+
+def _probe_webp(head: bytes) -> tuple[tuple[int, int, int], np.dtype]:
+    kind = head[12:16]
+    if kind == b"VP8 ":
+        width, height = struct.unpack_from("<HH", head, 26)
+        return (height & 0x3FFF, width & 0x3FFF, 3), np.dtype(np.uint8)
+    if kind == b"VP8L":
+        (bits,) = struct.unpack_from("<I", head, 21)
+        width = (bits & 0x3FFF) + 1
+        height = ((bits >> 14) & 0x3FFF) + 1
+        alpha = (bits >> 28) & 1
+        return (height, width, 4 if alpha else 3), np.dtype(np.uint8)
+    if kind == b"VP8X":
+        flags = head[20]
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return (height, width, 4 if flags & 0x10 else 3), np.dtype(np.uint8)
+    raise Exception(f"{kind=}, Unknown WebP chunk.")
+
+
+def probe(path: Path | bytes) -> tuple[tuple[int, ...], np.dtype]:
+    """
+    Returns the shape and dtype that `Image.read` would produce for an image, by only parsing its header.
+
+    `path` can also be the bytes of an image file, see `Image.from_bytes`.
+    Channels follow `cv2.IMREAD_UNCHANGED`, e.g. palettes are expanded to BGR(A) and CMYK JPEGs to BGR.
+    """
+    source = io.BytesIO(path) if isinstance(path, bytes) else open(path, "rb")
+    with source as file:
+        head = file.read(_HEAD_SIZE)
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _probe_png(file, head)
+        if head.startswith(b"\xff\xd8"):
+            return _probe_jpeg(file)
+        if head[:4] in (b"II*\x00", b"MM\x00*"):
+            return _probe_tiff(file, head)
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _probe_webp(head)
+        if head.startswith(b"\x93NUMPY"):
+            file.seek(0)
+            read_header = (
+                np.lib.format.read_array_header_1_0
+                if np.lib.format.read_magic(file) == (1, 0)
+                else np.lib.format.read_array_header_2_0
+            )
+            shape, _, dtype = read_header(file)
+            return shape, dtype
+
+    raise Exception("Can't probe the image, unsupported image format.")
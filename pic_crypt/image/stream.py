@@ -0,0 +1,175 @@
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import BinaryIO, Protocol
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Channels to PNG color type: grayscale, RGB, RGBA. Grayscale + alpha is left out, as OpenCV reads it back as
+# 4 channels, and refuses to write 2-channel images itself.
+_PNG_COLOR_TYPES = {1: 0, 3: 2, 4: 6}
+_ADLER_BASE = 65521
+
+
+def _write_png_chunk(file: BinaryIO, kind: bytes, data: bytes) -> None:
+    file.write(struct.pack(">I", len(data)))
+    file.write(kind)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+
+def _check_png_channels(channels: int) -> None:
+    if channels not in _PNG_COLOR_TYPES:
+        raise ValueError(
+            f"{channels=}, PNGs can only be written with 1, 3 or 4 channels."
+        )
+
+
+def _write_png_header(file: BinaryIO, width: int, height: int, channels: int) -> None:
+    _check_png_channels(channels)
+    file.write(PNG_SIGNATURE)
+    _write_png_chunk(
+        file,
+        b"IHDR",
+        struct.pack(">IIBBBBB", width, height, 8, _PNG_COLOR_TYPES[channels], 0, 0, 0),
+    )
+
+
+def _png_scanlines(rows: np.ndarray) -> bytes:
+    """Converts BGR(A) rows to RGB(A) scanlines, each prefixed with filter type 0 (None)."""
+    channels = rows.shape[2]
+    if channels >= 3:
+        rows = rows[..., [2, 1, 0, 3][:channels]]
+
+    scanlines = np.zeros((rows.shape[0], rows[0].size + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rows.reshape(rows.shape[0], -1)
+    return scanlines.tobytes()
+
+
+def _adler32_combine(adler1: int, adler2: int, len2: int) -> int:
+    """Returns the adler32 of two concatenated buffers, given the checksums of each."""
+    a1, b1 = adler1 & 0xFFFF, adler1 >> 16
+    a2, b2 = adler2 & 0xFFFF, adler2 >> 16
+    a = (a1 + a2 - 1) % _ADLER_BASE
+    b = (b1 + b2 + len2 * (a1 - 1)) % _ADLER_BASE
+    return b << 16 | a
+
+
+class RowWriter(Protocol):
+    """Writes an image to disk a few rows at a time, the rows have to be written in order."""
+
+    def write(self, rows: np.ndarray) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class PngRowWriter(RowWriter):
+    """
+    Writes an 8-bit PNG incrementally, deflating the rows as they come in.
+
+    Rows are in the BGR(A) channel order, same as `cv2.imwrite`.
+    """
+
+    IDAT_SIZE = 1 << 16
+
+    def __init__(
+        self, path: Path, width: int, height: int, channels: int, level: int = 6
+    ):
+        # Checked before the file is created, so no empty PNG is left behind.
+        _check_png_channels(channels)
+        self.file = open(path, "wb")
+        self.compressor = zlib.compressobj(level)
+        self.pending = bytearray()
+
+        _write_png_header(self.file, width, height, channels)
+
+    def _flush_idat(self, final: bool = False) -> None:
+        while len(self.pending) >= self.IDAT_SIZE or (final and self.pending):
+            _write_png_chunk(self.file, b"IDAT", bytes(self.pending[: self.IDAT_SIZE]))
+            del self.pending[: self.IDAT_SIZE]
+
+    def write(self, rows: np.ndarray) -> None:
+        self.pending += self.compressor.compress(_png_scanlines(rows))
+        self._flush_idat()
+
+    def close(self) -> None:
+        self.pending += self.compressor.flush()
+        self._flush_idat(final=True)
+        _write_png_chunk(self.file, b"IEND", b"")
+        self.file.close()
+
+
+class NpyRowWriter(RowWriter):
+    """Writes rows into a memory-mapped `.npy` file."""
+
+    def __init__(self, path: Path, width: int, height: int, channels: int):
+        self.array = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.uint8, shape=(height, width, channels)
+        )
+        self.row = 0
+
+    def write(self, rows: np.ndarray) -> None:
+        self.array[self.row : self.row + len(rows)] = rows
+        self.array.flush()
+        self.row += len(rows)
+
+    def close(self) -> None:
+        self.array.flush()
+        del self.array
+
+
+def open_row_writer(path: Path, width: int, height: int, channels: int) -> RowWriter:
+    """Opens a row writer for `path`, picked by its extension: `.png` or `.npy`."""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".png":
+        return PngRowWriter(path, width, height, channels)
+    if suffix == ".npy":
+        return NpyRowWriter(path, width, height, channels)
+    raise ValueError(f"{suffix=}, Only `.png` and `.npy` can be written row by row.")
+
+
+def write_png_parallel(
+    path: Path | BinaryIO,
+    img: np.ndarray,
+    level: int = 6,
+    workers: int | None = None,
+    block_size: int = 1 << 20,
+) -> None:
+    """
+    Writes an 8-bit PNG to a path or a binary file, deflating blocks of rows in parallel threads.
+
+    Each block is compressed independently and ends with a sync flush, so the blocks concatenate into one
+    deflate stream. Compression is slightly worse than a single stream, as blocks don't share history.
+    """
+    height, width, channels = img.shape
+    rows_per_block = max(block_size // (width * channels + 1), 1)
+    blocks = range(0, height, rows_per_block)
+
+    def deflate(start: int) -> tuple[bytes, int, int]:
+        scanlines = _png_scanlines(img[start : start + rows_per_block])
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        last = start + rows_per_block >= height
+        deflated = compressor.compress(scanlines) + compressor.flush(
+            zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+        )
+        return deflated, zlib.adler32(scanlines), len(scanlines)
+
+    with (
+        open(path, "wb") if isinstance(path, (str, Path)) else nullcontext(path)
+    ) as file, ThreadPoolExecutor(workers) as executor:
+        _write_png_header(file, width, height, channels)
+        # zlib header: deflate with a 32K window, default compression.
+        _write_png_chunk(file, b"IDAT", b"\x78\x9c")
+
+        adler = 1
+        for deflated, block_adler, length in executor.map(deflate, blocks):
+            _write_png_chunk(file, b"IDAT", deflated)
+            adler = _adler32_combine(adler, block_adler, length)
+
+        _write_png_chunk(file, b"IDAT", struct.pack(">I", adler))
+        _write_png_chunk(file, b"IEND", b"")
@@ -1,5 +1,9 @@
 import math
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
 from typing import Sequence
 
 import cv2
@@ -9,17 +13,306 @@ from PIL import Image, ImageDraw, ImageFont
 from ..defines import EAST_TEXT_DETECTION_MODEL_PATH, FONT_ANDALEMO_PATH
 
 
+class DnnBackend(Enum):
+    DEFAULT = cv2.dnn.DNN_BACKEND_DEFAULT
+    OPENCV = cv2.dnn.DNN_BACKEND_OPENCV
+    INFERENCE_ENGINE = cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE
+    CUDA = cv2.dnn.DNN_BACKEND_CUDA
+    VKCOM = cv2.dnn.DNN_BACKEND_VKCOM
+
+
+class DnnTarget(Enum):
+    CPU = cv2.dnn.DNN_TARGET_CPU
+    OPENCL = cv2.dnn.DNN_TARGET_OPENCL
+    OPENCL_FP16 = cv2.dnn.DNN_TARGET_OPENCL_FP16
+    VULKAN = cv2.dnn.DNN_TARGET_VULKAN
+    CUDA = cv2.dnn.DNN_TARGET_CUDA
+    CUDA_FP16 = cv2.dnn.DNN_TARGET_CUDA_FP16
+
+
+RotatedRect = tuple[tuple[float, float], tuple[float, float], float]
+
+
+def decode_geometry(
+    scores: np.ndarray, geometry: np.ndarray, score_threshold: float = 0.5
+) -> tuple[list[RotatedRect], list[float]]:
+    """
+    Decodes the output of the EAST network into rotated rects, in the pre-processed image, and their scores.
+
+    Every cell of the output maps to 4x4 pixels, and holds the distances from that point to the top, right, bottom
+    and left of a rect, and its angle. Only cells scoring at least `score_threshold` are decoded, all at once.
+    The rects are `(center, (width, height), angle)` with the angle in degrees, as `cv2.dnn.NMSBoxesRotated` takes.
+    """
+    ys, xs = np.nonzero(scores[0, 0] >= score_threshold)
+    top, right, bottom, left, angles = geometry[0][:, ys, xs]
+    cos = np.cos(angles)
+    sin = np.sin(angles)
+
+    height = top + bottom
+    width = right + left
+    offset_x = xs * 4.0 + cos * right + sin * bottom
+    offset_y = ys * 4.0 - sin * right + cos * bottom
+
+    # The center of the rect is between its top-left and bottom-right corners.
+    center_x = (-sin * height - cos * width) / 2 + offset_x
+    center_y = (-cos * height + sin * width) / 2 + offset_y
+
+    detections = list(
+        zip(
+            zip(center_x.tolist(), center_y.tolist()),
+            zip(width.tolist(), height.tolist()),
+            (-angles * 180.0 / math.pi).tolist(),
+        )
+    )
+    return detections, scores[0, 0, ys, xs].tolist()
+
+
+def _tile_starts(length: int, tile_size: int, overlap: int) -> list[int]:
+    """Returns where tiles begin along an axis, the last tile is aligned to the end rather than overhanging."""
+    if length <= tile_size:
+        return [0]
+    return [*range(0, length - tile_size, tile_size - overlap), length - tile_size]
+
+
+class EastTextDetector:
+    """
+    The EAST text detection network, loaded once and reused for every image.
+
+    - `backend` and `target` pick where inference runs, e.g. `DnnBackend.CUDA` with `DnnTarget.CUDA`.
+    - `threads` sets the number of threads OpenCV uses, note that it's process-wide.
+    - `warm_up` runs an inference up front, so the first image doesn't pay for the lazy set up of the network.
+
+    Use `EastTextDetector.shared` to get the detector of the current process rather than loading another.
+
+    ```py
+    detector = EastTextDetector.shared(target=DnnTarget.OPENCL, warm_up=True)
+    bboxes = detector.detect(cv2.imread("img.png"))
+    ```
+    """
+
+    LAYERS = ("feature_fusion/Conv_7/Sigmoid", "feature_fusion/concat_3")
+    MEAN = (123.68, 116.78, 103.94)
+
+    _shared: dict[tuple, "EastTextDetector"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        model_path: Path = EAST_TEXT_DETECTION_MODEL_PATH,
+        backend: DnnBackend = DnnBackend.DEFAULT,
+        target: DnnTarget = DnnTarget.CPU,
+        threads: int | None = None,
+    ):
+        if threads is not None:
+            cv2.setNumThreads(threads)
+
+        self.net = cv2.dnn.readNet(str(model_path))
+        self.net.setPreferableBackend(backend.value)
+        self.net.setPreferableTarget(target.value)
+        # A network holds its input between `setInput` and `forward`, so inferences can't overlap.
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(
+        cls,
+        backend: DnnBackend = DnnBackend.DEFAULT,
+        target: DnnTarget = DnnTarget.CPU,
+        threads: int | None = None,
+        warm_up: bool = False,
+    ) -> "EastTextDetector":
+        """Returns the detector of this process for `backend` and `target`, loading it on first use."""
+        key = (backend, target)
+        with cls._shared_lock:
+            detector = cls._shared.get(key)
+            if detector is None:
+                detector = cls._shared[key] = cls(
+                    backend=backend, target=target, threads=threads
+                )
+                if warm_up:
+                    detector.warm_up()
+            elif threads is not None:
+                cv2.setNumThreads(threads)
+        return detector
+
+    def warm_up(self, pp_width: int = 320, pp_height: int = 320) -> None:
+        """Runs an inference on a blank image, initializing the network for images of these dimensions."""
+        self.forward(np.zeros((pp_height, pp_width, 3), np.uint8), pp_width, pp_height)
+
+    def forward(
+        self, img: np.ndarray, pp_width: int = 320, pp_height: int = 320
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the scores and geometry the network outputs for an image, resized to the pre-processed size."""
+        return self.forward_batch([img], pp_width, pp_height)
+
+    def forward_batch(
+        self, imgs: Sequence[np.ndarray], pp_width: int = 320, pp_height: int = 320
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Like `forward`, but stacks the images into a single blob, the outputs hold a row for each image."""
+        blob = cv2.dnn.blobFromImages(
+            [cv2.resize(img, (pp_width, pp_height)) for img in imgs],
+            1.0,
+            (pp_width, pp_height),
+            self.MEAN,
+            swapRB=True,
+            crop=False,
+        )
+
+        with self._lock:
+            self.net.setInput(blob)
+            scores, geometry = self.net.forward(self.LAYERS)
+        return scores, geometry
+
+    def detect(
+        self,
+        img: np.ndarray,
+        pp_width: int = 320,
+        pp_height: int = 320,
+        score_threshold: float = 0.5,
+        nms_threshold: float = 0.3,
+    ) -> np.ndarray:
+        """Returns the bounding boxes of the text in an image, see `east_text_bbox`."""
+        return self.detect_batch(
+            [img], pp_width, pp_height, score_threshold, nms_threshold
+        )[0]
+
+    def detect_batch(
+        self,
+        imgs: Sequence[np.ndarray],
+        pp_width: int = 320,
+        pp_height: int = 320,
+        score_threshold: float = 0.5,
+        nms_threshold: float = 0.3,
+        batch_size: int = 8,
+    ) -> list[np.ndarray]:
+        """
+        Returns the bounding boxes of the text in each image, in a single forward pass for every `batch_size` images.
+
+        The images can have different dimensions, the boxes are scaled back to each image.
+        """
+        results = []
+        for start in range(0, len(imgs), batch_size):
+            batch = imgs[start : start + batch_size]
+            scores, geometry = self.forward_batch(batch, pp_width, pp_height)
+
+            for i, img in enumerate(batch):
+                height, width = img.shape[:2]
+                ratio = np.array([width / pp_width, height / pp_height], np.float32)
+
+                detections, confidences = decode_geometry(
+                    scores[i : i + 1], geometry[i : i + 1], score_threshold
+                )
+                indices = cv2.dnn.NMSBoxesRotated(
+                    detections, confidences, score_threshold, nms_threshold
+                )
+
+                bboxes = [cv2.boxPoints(detections[j]) * ratio for j in indices]
+                results.append(np.array(bboxes, dtype=np.int32))
+
+        return results
+
+    def detect_tiled(
+        self,
+        img: np.ndarray,
+        tile_size: int = 320,
+        overlap: int = 64,
+        scales: Sequence[float] = (1.0,),
+        score_threshold: float = 0.5,
+        nms_threshold: float = 0.3,
+        batch_size: int = 8,
+        workers: int = 1,
+    ) -> np.ndarray:
+        """
+        Returns the bounding boxes of the text in an image, detected at the network's native scale.
+
+        Rather than resizing the whole image to a single input, it's split into overlapping tiles of `tile_size`
+        pixels, so small text in large images isn't lost and the cost grows linearly with the area.
+        - The boxes of every tile are merged by a single rotated NMS, text within an overlap is only kept once.
+        - `overlap` should be larger than the text, or text cut by the edge of a tile is found in neither.
+        - `scales` also tiles the image resized by each factor, e.g. `(1.0, 0.25)` to find text too large for a tile.
+        - `workers` threads decode the output of a batch of tiles while the network runs on the next batch.
+        """
+        if tile_size % 32 or not 0 <= overlap < tile_size:
+            raise ValueError(
+                f"{tile_size=}, {overlap=}, expected a multiple of 32 and an overlap smaller than it."
+            )
+
+        tiles: list[tuple[np.ndarray, int, int, float]] = []
+        for scale in scales:
+            scaled = (
+                img
+                if scale == 1
+                else cv2.resize(
+                    img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+                )
+            )
+            height, width = scaled.shape[:2]
+            for y in _tile_starts(height, tile_size, overlap):
+                for x in _tile_starts(width, tile_size, overlap):
+                    tile = scaled[y : y + tile_size, x : x + tile_size]
+                    # Images smaller than a tile are padded rather than stretched.
+                    tile = cv2.copyMakeBorder(
+                        tile,
+                        0,
+                        tile_size - tile.shape[0],
+                        0,
+                        tile_size - tile.shape[1],
+                        cv2.BORDER_CONSTANT,
+                    )
+                    tiles.append((tile, x, y, scale))
+
+        def decode_batch(
+            batch: list[tuple[np.ndarray, int, int, float]]
+        ) -> tuple[list[RotatedRect], list[float]]:
+            scores, geometry = self.forward_batch(
+                [tile for tile, *_ in batch], tile_size, tile_size
+            )
+
+            detections, confidences = [], []
+            for i, (_, x, y, scale) in enumerate(batch):
+                rects, rect_scores = decode_geometry(
+                    scores[i : i + 1], geometry[i : i + 1], score_threshold
+                )
+                # Back to the coordinates of the whole, unscaled image.
+                detections.extend(
+                    (
+                        ((cx + x) / scale, (cy + y) / scale),
+                        (w / scale, h / scale),
+                        angle,
+                    )
+                    for (cx, cy), (w, h), angle in rects
+                )
+                confidences.extend(rect_scores)
+            return detections, confidences
+
+        batches = [
+            tiles[start : start + batch_size]
+            for start in range(0, len(tiles), batch_size)
+        ]
+        detections, confidences = [], []
+        with ThreadPoolExecutor(workers) as executor:
+            for rects, rect_scores in executor.map(decode_batch, batches):
+                detections.extend(rects)
+                confidences.extend(rect_scores)
+
+        indices = cv2.dnn.NMSBoxesRotated(
+            detections, confidences, score_threshold, nms_threshold
+        )
+        return np.array([cv2.boxPoints(detections[i]) for i in indices], np.int32)
+
+
 def east_text_bbox(
     img: np.ndarray,
     pp_width: int = 320,
     pp_height: int = 320,
     score_threshold: float = 0.5,
     nms_threshold: float = 0.3,
+    detector: EastTextDetector | None = None,
 ) -> np.ndarray:
     """
     Returns an array of arrays, where each inner array contains points defining a bounding box.
 
     `pp_width` and `pp_height` represent pre-processed dimensions and should always be multiples of 32.
+    `detector` defaults to the shared one, see `EastTextDetector.shared`, so the network is only loaded once.
 
     ```py
     img = cv2.imread("img.png")
@@ -28,76 +321,125 @@ def east_text_bbox(
         cv2.polylines(img, [pts], True, (0, 255, 0), 2)
     ```
     """
-    layers = ("feature_fusion/Conv_7/Sigmoid", "feature_fusion/concat_3")
-    detector = cv2.dnn.readNet(str(EAST_TEXT_DETECTION_MODEL_PATH))
+    detector = EastTextDetector.shared() if detector is None else detector
+    return detector.detect(img, pp_width, pp_height, score_threshold, nms_threshold)
 
-    height, width = img.shape[:2]
-    ratio_height = height / pp_height
-    ratio_width = width / pp_width
 
-    img = cv2.resize(img, (pp_width, pp_height))
-    height, width = img.shape[:2]
-
-    blob = cv2.dnn.blobFromImage(
-        img, 1.0, (width, height), (123.68, 116.78, 103.94), swapRB=True, crop=False
+def east_text_bbox_batch(
+    imgs: Sequence[np.ndarray],
+    pp_width: int = 320,
+    pp_height: int = 320,
+    score_threshold: float = 0.5,
+    nms_threshold: float = 0.3,
+    batch_size: int = 8,
+    detector: EastTextDetector | None = None,
+) -> list[np.ndarray]:
+    """Like `east_text_bbox` for several images, which are run through the network `batch_size` at a time."""
+    detector = EastTextDetector.shared() if detector is None else detector
+    return detector.detect_batch(
+        imgs, pp_width, pp_height, score_threshold, nms_threshold, batch_size
     )
 
-    detector.setInput(blob)
-    scores, geometry = detector.forward(layers)
 
-    rows, cols = scores.shape[2:4]
-    detections, confidences = [], []
-
-    for y in range(rows):
-        score = scores[0, 0, y]
-        *dimensions, angles = tuple(geometry[0, i, y] for i in range(5))
-
-        for x in range(cols):
-            if score[x] < score_threshold:
-                continue
-
-            angle = angles[x]
-            cos = np.cos(angle)
-            sin = np.sin(angle)
-
-            height = dimensions[0][x] + dimensions[2][x]
-            width = dimensions[1][x] + dimensions[3][x]
-
-            offset_x, offset_y = (
-                x * 4.0 + cos * dimensions[1][x] + sin * dimensions[2][x],
-                y * 4.0 - sin * dimensions[1][x] + cos * dimensions[2][x],
-            )
+def east_text_bbox_tiled(
+    img: np.ndarray,
+    tile_size: int = 320,
+    overlap: int = 64,
+    scales: Sequence[float] = (1.0,),
+    score_threshold: float = 0.5,
+    nms_threshold: float = 0.3,
+    batch_size: int = 8,
+    workers: int = 1,
+    detector: EastTextDetector | None = None,
+) -> np.ndarray:
+    """Like `east_text_bbox` for high-resolution images, which are detected a tile at a time, see `detect_tiled`."""
+    detector = EastTextDetector.shared() if detector is None else detector
+    return detector.detect_tiled(
+        img,
+        tile_size,
+        overlap,
+        scales,
+        score_threshold,
+        nms_threshold,
+        batch_size,
+        workers,
+    )
 
-            p1 = (-sin * height + offset_x, -cos * height + offset_y)
-            p2 = (-cos * width + offset_x, sin * width + offset_y)
-            center = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
 
-            detections.append((center, (width, height), -1 * angle * 180.0 / math.pi))
-            confidences.append(score[x])
+class InpaintStrategy(Enum):
+    # Inpaints each box within its padded bounding rect, and writes the result back.
+    ROI = "roi"
+    # Inpaints every box at once, through a single mask covering the whole image.
+    COMBINED = "combined"
+    # `ROI` for at most `ROI_MAX_BOXES` boxes whose padded rects cover less than `ROI_AREA_LIMIT` of the image,
+    # otherwise `COMBINED`.
+    AUTO = "auto"
 
-    indices = cv2.dnn.NMSBoxesRotated(
-        detections, confidences, score_threshold, nms_threshold
-    )
 
-    bboxes = []
-    for i in indices:
-        pts = cv2.boxPoints(detections[i])
+# Share of the image the padded rects of the boxes can cover before a single combined pass is cheaper.
+ROI_AREA_LIMIT = 0.5
+# Boxes beyond which a single combined pass is cheaper, as each rect is a separate inpaint and the rects of
+# crowded boxes overlap, so their pixels get inpainted more than once.
+ROI_MAX_BOXES = 256
 
-        for j in range(4):
-            pts[j][0] *= ratio_width
-            pts[j][1] *= ratio_height
 
-        bboxes.append(pts)
+def _padded_rects(
+    shape: tuple[int, ...], bboxes: np.ndarray, padding: int
+) -> list[tuple[int, int, int, int]]:
+    """Returns the bounding rect of each box grown by `padding`, clipped to the image, as `(x0, y0, x1, y1)`."""
+    height, width = shape[:2]
+    rects = []
+    for pts in bboxes:
+        x, y, w, h = cv2.boundingRect(pts)
+        rects.append(
+            (
+                max(x - padding, 0),
+                max(y - padding, 0),
+                min(x + w + padding, width),
+                min(y + h + padding, height),
+            )
+        )
+    return rects
 
-    return np.array(bboxes, dtype=np.int32)
 
+def inpaint_bbox(
+    img: np.ndarray,
+    bboxes: np.ndarray,
+    radius: int = 3,
+    strategy: InpaintStrategy = InpaintStrategy.AUTO,
+) -> np.ndarray:
+    """
+    Inpaints the bboxes for an image, returns a new image.
 
-def inpaint_bbox(img: np.ndarray, bboxes: np.ndarray) -> np.ndarray:
-    """Inpaints the bboxes for an image."""
-    for pts in bboxes:
+    Rather than inpainting the whole image once per box, either every box is inpainted in a single pass over a
+    combined mask, or each box only within its bounding rect, padded so the inpainting sees the same surroundings.
+    See `InpaintStrategy`, by default the cheaper one is picked by the number of boxes and the area they cover.
+    """
+    if len(bboxes) == 0:
+        return img.copy()
+
+    # Inpainting reads `radius` pixels around the mask, a margin beyond that keeps the edges of a rect out of it.
+    rects = _padded_rects(img.shape, bboxes, radius * 2 + 1)
+    if strategy is InpaintStrategy.AUTO:
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects)
+        strategy = (
+            InpaintStrategy.ROI
+            if len(bboxes) <= ROI_MAX_BOXES
+            and area < ROI_AREA_LIMIT * img.shape[0] * img.shape[1]
+            else InpaintStrategy.COMBINED
+        )
+
+    if strategy is InpaintStrategy.COMBINED:
         mask = np.zeros(img.shape[:2], np.uint8)
-        cv2.fillPoly(mask, [pts], 255)
-        img = cv2.inpaint(img, mask, 3, cv2.INPAINT_NS)
+        cv2.fillPoly(mask, list(bboxes), 255)
+        return cv2.inpaint(img, mask, radius, cv2.INPAINT_NS)
+
+    img = img.copy()
+    for pts, (x0, y0, x1, y1) in zip(bboxes, rects):
+        roi = img[y0:y1, x0:x1]
+        mask = np.zeros(roi.shape[:2], np.uint8)
+        cv2.fillPoly(mask, [(pts - (x0, y0)).astype(np.int32)], 255)
+        roi[...] = cv2.inpaint(roi, mask, radius, cv2.INPAINT_NS)
     return img
 
 
@@ -0,0 +1,80 @@
+"""
+Accounting of the memory each stage of encoding allocates, so regressions can be caught.
+
+Encoders mark their stages, like compressing or copying the cover, and while hooks are registered each stage is
+measured with `tracemalloc`: the peak traced memory within the stage, above what was traced when it began. So every
+allocation counts, numpy's included, not just the ones an encoder knows to report. With no hooks registered, or
+`tracemalloc` not tracing, stages aren't measured.
+
+```py
+with memory.track() as stages:
+    LsbSteganographyEncoder(data, img).encode(out=img)
+assert stages["lsb.copy"] < img.nbytes
+```
+"""
+
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+AllocationHook = Callable[[str, int], None]
+
+_hooks: list[AllocationHook] = []
+# `[traced when the stage began, peak so far]` of each stage being measured, innermost last.
+_open: list[list[int]] = []
+
+
+def add_hook(hook: AllocationHook) -> None:
+    """Registers a hook, called with the name of a stage and the peak number of bytes it allocated."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook: AllocationHook) -> None:
+    _hooks.remove(hook)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Measures the peak memory allocated within the block, and reports it to the hooks as `name`."""
+    if not _hooks or not tracemalloc.is_tracing():
+        yield
+        return
+
+    current, peak = tracemalloc.get_traced_memory()
+    # The peak is reset for this stage, so the stages it's nested in keep the peak reached up to here.
+    for outer in _open:
+        outer[1] = max(outer[1], peak)
+    tracemalloc.reset_peak()
+    _open.append([current, current])
+    try:
+        yield
+    finally:
+        start, peak = _open.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        for hook in _hooks:
+            hook(name, peak - start)
+
+
+@contextmanager
+def track() -> Iterator[dict[str, int]]:
+    """
+    Collects the peak bytes allocated by each stage within the block.
+
+    - `tracemalloc` is started for the block unless it's already tracing.
+    - A stage run more than once reports its largest peak.
+    """
+    stages: dict[str, int] = {}
+
+    def hook(name: str, nbytes: int) -> None:
+        stages[name] = max(stages.get(name, 0), nbytes)
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    add_hook(hook)
+    try:
+        yield stages
+    finally:
+        remove_hook(hook)
+        if started:
+            tracemalloc.stop()
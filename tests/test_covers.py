@@ -0,0 +1,19 @@
+import shutil
+from pathlib import Path
+
+from pic_crypt.covers import CoverPool
+
+
+def test_cover_pool_unwritable_index(tmp_path, monkeypatch):
+    shutil.copy(Path(__file__).parent / "stop.jpg", tmp_path)
+
+    def write_text(self, *args, **kwargs):
+        raise PermissionError(13, "Permission denied", str(self))
+
+    # As in a read-only directory, which root could still write to.
+    monkeypatch.setattr(Path, "write_text", write_text)
+    pool = CoverPool(tmp_path)
+
+    assert len(pool) == 1
+    assert pool.best_fit(10) == tmp_path / "stop.jpg"
+    assert not pool.index_path.exists()
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from pic_crypt.batch import decode_images
+from pic_crypt.ciphers import KDF, PBKDF2, Cipher
+from pic_crypt.cli import app
+from pic_crypt.compression import Codec
+from pic_crypt.detect import describe
+from pic_crypt.encoders import DirectEncoder, LsbSteganographyEncoder
+from pic_crypt.image import Image
+
+SECRET = b"passw0rd"
+DATA = os.urandom(4096)
+
+
+def _encrypted() -> bytes:
+    # Few iterations, only the recorded ids matter here.
+    return Cipher.ChaCha20.value().encrypt(DATA, SECRET, kdf=PBKDF2(iterations=1000))
+
+
+def _encode(method: str, data: bytes, codec: Codec) -> np.ndarray:
+    if method == "direct":
+        return DirectEncoder(data, framed=True, compression=codec).encode().as_array()
+    cover = np.random.default_rng(0).integers(0, 256, (160, 160, 3), dtype=np.uint8)
+    return LsbSteganographyEncoder(data, cover, compression=codec).encode().as_array()
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+@pytest.mark.parametrize("method", ["direct", "steganography"])
+def test_describe_encrypted(method: str, codec: Codec):
+    described = describe(_encode(method, _encrypted(), codec))
+    assert described[0] == method
+    assert described[2] is codec
+    assert described[3:] == (Cipher.ChaCha20, KDF.PBKDF2)
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+@pytest.mark.parametrize("method", ["direct", "steganography"])
+def test_describe_unencrypted(method: str, codec: Codec):
+    assert describe(_encode(method, DATA, codec))[3:] == (None, None)
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+def test_decode_images_auto(tmp_path, codec: Codec):
+    paths = []
+    for method in ("direct", "steganography"):
+        path = tmp_path / f"{method}.png"
+        Image(_encode(method, _encrypted(), codec)).save(path)
+        paths.append(path)
+
+    results = list(decode_images(paths, "auto", SECRET, max_workers=1))
+    assert sorted(results) == [(path, DATA, None) for path in paths]
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+@pytest.mark.parametrize("method", ["direct", "steganography"])
+def test_cli_decode_auto(tmp_path, method: str, codec: Codec):
+    img = tmp_path / "img.png"
+    out = tmp_path / "out.bin"
+    Image(_encode(method, _encrypted(), codec)).save(img)
+
+    result = CliRunner().invoke(
+        app,
+        ["decode", "auto", str(img), "-o", str(out), "-k", SECRET.decode()],
+    )
+    assert result.exit_code == 0, result.output
+    assert "ChaCha20 with PBKDF2" in result.output
+    assert out.read_bytes() == DATA
+
+
+def test_describe_headerless():
+    img = DirectEncoder(DATA).encode().as_array()
+    assert describe(img) == ("direct", None, Codec.NONE, None, None)
+
+
+def test_decode_auto_headerless(tmp_path):
+    img = tmp_path / "img.png"
+    out = tmp_path / "out.bin"
+    Image(DirectEncoder(DATA).encode().as_array()).save(img)
+
+    result = CliRunner().invoke(app, ["decode", "auto", str(img), "-o", str(out)])
+    assert result.exit_code == 0, result.output
+    # Unframed, the padding of the last row is decoded along with the data.
+    assert out.read_bytes().rstrip(b"\0") == DATA.rstrip(b"\0")
+
+    results = list(decode_images([img], "auto", max_workers=1))
+    assert results == [(img, out.read_bytes(), None)]
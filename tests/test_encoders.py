@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from pic_crypt.ciphers import PBKDF2, Cipher
+from pic_crypt.encoders import DirectEncoder
+from pic_crypt.image import Image
+
+# Unframed data which happens to begin like a frame.
+MAGIC_DATA = DirectEncoder.FRAME_MAGIC + b"\x02 not a frame"
+
+
+def test_direct_frames_data_beginning_with_magic():
+    img = DirectEncoder(MAGIC_DATA).encode().as_array()
+    assert DirectEncoder().decode(img) == MAGIC_DATA
+
+
+def test_direct_stream_frames_data_beginning_with_magic(tmp_path):
+    source = tmp_path / "data.bin"
+    source.write_bytes(MAGIC_DATA)
+    with open(source, "rb") as file:
+        DirectEncoder().encode_stream(file, tmp_path / "img.png")
+
+    img = Image.read(tmp_path / "img.png").as_array()
+    assert DirectEncoder().decode(img) == MAGIC_DATA
+
+
+def test_direct_rejects_zero_chunk_size():
+    img = DirectEncoder(b"data", framed=True).encode().as_array()
+    raw = img.reshape(-1)
+    raw[5:9] = 0  # the chunk size, after the magic and version
+
+    with pytest.raises(Exception, match="Corrupted frame header"):
+        DirectEncoder().read_frame_header(img)
+
+
+def test_direct_verify_chunk_out_of_range():
+    img = DirectEncoder(b"data", framed=True).encode().as_array()
+    with pytest.raises(Exception, match="index=1"):
+        DirectEncoder().verify_chunk(img, 1)
+
+
+@pytest.mark.parametrize("size", [0, 100, 3 * 1024 + 5])
+def test_direct_unframed_stream_padding(size: int):
+    data = os.urandom(size)
+    cipher = Cipher.AESGCM.value()
+    stream = b"".join(
+        cipher.encrypt_stream(
+            [data], b"key", PBKDF2(iterations=1000), segment_size=1024
+        )
+    )
+
+    # Unframed, the stream is padded with zeros to fill the image.
+    img = DirectEncoder(stream).encode().as_array()
+    assert cipher.decrypt(DirectEncoder().decode(img), b"key") == data